@@ -1,16 +1,23 @@
-from .router_agent import RouterAgent
-from .agent_1 import Agent1
-from .agent_2 import Agent2
-from .agent_3 import Agent3
-from .pdf_agent import PDFAgent
-from .summary_agent import SummaryAgent
+import importlib
 
-__all__ = [
-    "RouterAgent",
-    "Agent1",
-    "Agent2",
-    "Agent3",
-    "PDFAgent",
-    "SummaryAgent",
-]
+# Agents are imported on first attribute access, so importing one submodule
+# (e.g. ``agents.base_agent``) does not pull in every agent's dependencies
+_EXPORTS = {
+    "RouterAgent": ".router_agent",
+    "RoutingBatcher": ".router_batcher",
+    "Agent1": ".agent_1",
+    "Agent2": ".agent_2",
+    "Agent3": ".agent_3",
+    "PDFAgent": ".pdf_agent",
+    "SummaryAgent": ".summary_agent",
+}
 
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,7 +1,7 @@
 """Agent 1: Collects data fields a, b, c through conversation."""
-from langchain_core.prompts import ChatPromptTemplate
 from models.schemas import ConversationState, Agent1Data, AgentType, DataCollectionResult
 from agents.base_agent import BaseAgent
+from agents.prompt_layout import cached_prompt
 
 
 class Agent1(BaseAgent):
@@ -10,8 +10,8 @@ class Agent1(BaseAgent):
     def __init__(self, llm=None, **kwargs):
         super().__init__(llm=llm, agent_type=AgentType.AGENT_1, **kwargs)
         
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are Agent 1, responsible for collecting three related pieces of information: field_a, field_b, and field_c.
+        self.prompt = cached_prompt(
+            """You are Agent 1, responsible for collecting three related pieces of information: field_a, field_b, and field_c.
 
 The user may not know that these fields belong together. Your job is to:
 1. Acknowledge what they want to provide
@@ -23,23 +23,20 @@ IMPORTANT:
 - If some fields are already collected, ask for the missing ones
 - When you have all three, confirm the collected data
 
-Already collected data: {collected_data}
+Respond conversationally and ask for the next missing field.""",
+            """Already collected data: {collected_data}
 
-Respond conversationally and ask for the next missing field."""),
-            ("human", """Conversation history:
+Conversation history:
 {history}
 
 User just said: {user_input}
 
-Respond helpfully and ask for the next field if needed."""),
-        ])
+Respond helpfully and ask for the next field if needed.""",
+        )
     
     async def process(self, state: ConversationState) -> ConversationState:
         """Process data collection for Agent 1 through conversation."""
-        history = "\n".join([
-            f"{msg.get('role', 'unknown')}: {msg.get('content', '')}"
-            for msg in state.messages[-10:]
-        ])
+        history = self.build_history(state)
         
         # Get existing collected data for this agent
         existing_data = {}
@@ -50,8 +47,7 @@ Respond helpfully and ask for the next field if needed."""),
         agent_context = state.context.get("agent_1_data", {})
         existing_data.update(agent_context)
         
-        chain = self.prompt | self.llm
-        response = await chain.ainvoke({
+        response = await self.invoke_llm(self.prompt, {
             "history": history or "No previous conversation",
             "user_input": state.user_input,
             "collected_data": existing_data if existing_data else "Nothing collected yet",
@@ -77,7 +73,7 @@ Respond helpfully and ask for the next field if needed."""),
                 data=existing_data,
                 success=True,
             )
-            state.collected_data[self.agent_type] = result
+            self.store_result(state, result)
         
         # Add agent response to history
         state.messages.append({
@@ -1,54 +1,260 @@
 """Base agent class with dependency injection support."""
+import hashlib
+import json
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, Optional, Callable, TYPE_CHECKING
 from models.schemas import ConversationState, AgentType, DataCollectionResult
+from agents.model_cascade import ModelCascade
+from agents.context import ContextBuilder
+from agents.prompt_layout import PromptUsageTracker
+from agents.single_flight import SingleFlight, prompt_key
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from models.export import ResultExporter
+
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_TEMPERATURE = 0.7
+
+
+def create_llm(model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE, **kwargs) -> "ChatOpenAI":
+    """
+    Create a chat model with the project defaults.
+
+    Args:
+        model: Model name
+        temperature: Sampling temperature
+        **kwargs: Additional ChatOpenAI arguments (e.g. api_key)
+
+    Returns:
+        Chat model instance
+    """
+    # langchain_openai (and the openai SDK) are slow to import; only pay for
+    # them when a real model is created
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=model, temperature=temperature, **kwargs)
+
+
+async def prewarm_llm(llm: Any, timeout: float = 5.0) -> bool:
+    """
+    Open the model's HTTP connection ahead of the first real request.
+
+    Sends a cheap authenticated request (listing models) through the same
+    async client the model uses, so DNS, TCP and TLS setup are done by the
+    time the first prompt goes out. Intended to run in the background while
+    the user is still typing.
+
+    Args:
+        llm: Chat model or ModelCascade (every tier is warmed)
+        timeout: Seconds to wait for each warm-up request; it is not retried
+
+    Returns:
+        True if at least one connection was warmed
+    """
+    models = [tier.llm for tier in llm.tiers] if isinstance(llm, ModelCascade) else [llm]
+    warmed = False
+    for model in models:
+        client = getattr(model, "root_async_client", None)
+        if client is None:
+            continue
+        try:
+            # with_options shares the underlying HTTP connection pool
+            await client.with_options(timeout=timeout, max_retries=0).models.list()
+            warmed = True
+        except Exception:
+            # Warming is best effort; the first request will connect instead
+            pass
+    return warmed
 
 
 class BaseAgent(ABC):
     """Base class for all agents with dependency injection."""
-    
+
+    # Tokens of conversation history sent with each prompt
+    history_budget_tokens: int = 1024
+
     def __init__(
         self,
-        llm: Optional[ChatOpenAI] = None,
+        llm: Optional[Any] = None,
         agent_type: Optional[AgentType] = None,
         **kwargs
     ):
         """
         Initialize base agent with dependency injection.
-        
+
         Args:
-            llm: Language model instance (injected dependency)
+            llm: Language model instance or ModelCascade (injected dependency)
             agent_type: Type of this agent
-            **kwargs: Additional configuration
+            **kwargs: Additional configuration (``history_budget_tokens``
+                overrides the agent's default history budget, ``usage_tracker``
+                is a shared PromptUsageTracker, ``single_flight`` a shared
+                SingleFlight that deduplicates identical concurrent work,
+                ``result_sink`` a ResultExporter receiving completed results)
         """
-        self.llm = llm or ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.7,
-        )
+        self.cascade: Optional[ModelCascade] = None
+        if isinstance(llm, ModelCascade):
+            self.cascade = llm
+            llm = llm.llm
+        self.llm = llm or create_llm()
         self.agent_type = agent_type
         self.config = kwargs
-    
+        self.context_builder = ContextBuilder(
+            kwargs.get("history_budget_tokens", self.history_budget_tokens)
+        )
+        self.usage_tracker: PromptUsageTracker = kwargs.get("usage_tracker") or PromptUsageTracker()
+        self.single_flight: Optional[SingleFlight] = kwargs.get("single_flight")
+        self.result_sink: Optional["ResultExporter"] = kwargs.get("result_sink")
+
+    @property
+    def name(self) -> str:
+        """Node name of this agent."""
+        return self.agent_type.value if self.agent_type else "router"
+
+    def build_history(self, state: ConversationState) -> str:
+        """
+        Render recent conversation history within this agent's token budget.
+
+        The number of history tokens sent is recorded in
+        ``state.context["history_tokens"]`` under the agent's name.
+
+        Args:
+            state: Current conversation state
+
+        Returns:
+            History text, oldest message first
+        """
+        history = self.context_builder.build(state.messages)
+        state.context.setdefault("history_tokens", {})[self.name] = history.tokens
+        return history.text
+
+    def store_result(self, state: ConversationState, result: DataCollectionResult) -> None:
+        """
+        Store this agent's result in ``state.collected_data``.
+
+        A successful result whose data differs from what was last exported
+        for the session is also handed to the result sink, so the export sees
+        each completion once, when it happens.
+
+        Args:
+            state: Current conversation state
+            result: This agent's result
+        """
+        state.collected_data[self.agent_type] = result
+        self.export_result(state, result)
+
+    def export_result(self, state: ConversationState, result: DataCollectionResult, key: Optional[str] = None) -> None:
+        """
+        Hand a successful result to the result sink unless the same data was
+        already exported under ``key`` for this session.
+
+        Args:
+            state: Current conversation state
+            result: Result to export
+            key: Identifies the exported record within the session; defaults
+                to the agent name
+        """
+        if self.result_sink is None or not result.success:
+            return
+        encoded = json.dumps(result.data, sort_keys=True, default=str).encode("utf-8")
+        digest = hashlib.sha256(encoded).hexdigest()
+        exported = state.context.setdefault("exported_results", {})
+        key = key or self.name
+        if exported.get(key) != digest:
+            exported[key] = digest
+            self.result_sink.emit(state.context.get("session_id"), result)
+
+    async def deduplicated(self, kind: str, key: Any, fn: Callable[[], Any]) -> Any:
+        """
+        Await ``fn()``, sharing it with identical in-flight work when a
+        SingleFlight is configured.
+
+        Args:
+            kind: Metrics category ("llm", "pdf", "summary", ...)
+            key: Content or prompt hash identifying the work
+            fn: Coroutine function doing the work
+
+        Returns:
+            Result of the (possibly shared) work
+        """
+        if self.single_flight is None:
+            return await fn()
+        return await self.single_flight.do(kind, key, fn)
+
+    def llm_key(self, prompt: Any, inputs: Dict[str, Any], *extra: Any) -> Any:
+        """Identity of a model call: the model, ``extra`` and the rendered prompt."""
+        return (id(self.cascade or self.llm), *extra, prompt_key(prompt, inputs))
+
+    async def invoke_llm(
+        self,
+        prompt: Any,
+        inputs: Dict[str, Any],
+        parser: Any = None,
+        confidence: Optional[Callable[[Any], float]] = None,
+        dedupe: bool = False,
+    ) -> Any:
+        """
+        Render a prompt and call the model, through the cascade if one is set.
+
+        Args:
+            prompt: Prompt template
+            inputs: Template variables
+            parser: Optional output parser
+            confidence: Optional confidence getter for cascade escalation
+            dedupe: The call is cacheable (its answer does not depend on who
+                asks), so identical concurrent calls may share one request
+
+        Returns:
+            Parsed result, or the model's message when no parser is given
+        """
+        if dedupe and self.single_flight is not None:
+            key = self.llm_key(prompt, inputs, type(parser).__name__)
+            return await self.single_flight.do(
+                "llm", key, lambda: self._invoke_llm(prompt, inputs, parser, confidence),
+            )
+        return await self._invoke_llm(prompt, inputs, parser, confidence)
+
+    async def _invoke_llm(
+        self,
+        prompt: Any,
+        inputs: Dict[str, Any],
+        parser: Any,
+        confidence: Optional[Callable[[Any], float]],
+    ) -> Any:
+        def record_usage(message: Any) -> None:
+            self.usage_tracker.record(self.name, message)
+
+        if self.cascade is not None:
+            return await self.cascade.ainvoke(
+                prompt, inputs, parser=parser, confidence=confidence, on_message=record_usage,
+            )
+
+        message = await (prompt | self.llm).ainvoke(inputs)
+        record_usage(message)
+        if parser is not None:
+            return parser.invoke(message)
+        return message
+
     @abstractmethod
     async def process(self, state: ConversationState) -> ConversationState:
         """
         Process the conversation state and return updated state.
-        
+
         Args:
             state: Current conversation state
-            
+
         Returns:
             Updated conversation state
         """
         pass
-    
+
     def extract_data(self, state: ConversationState) -> DataCollectionResult:
         """
         Extract structured data from the conversation.
-        
+
         Args:
             state: Current conversation state
-            
+
         Returns:
             Data collection result
         """
@@ -57,4 +263,3 @@ class BaseAgent(ABC):
             data={},
             success=False,
         )
-
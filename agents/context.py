@@ -0,0 +1,165 @@
+"""Token-budgeted conversation history for agent prompts."""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_encoding: Any = None
+
+
+def _get_encoding() -> Any:
+    """Load the tiktoken encoding once; ``False`` if it is unavailable."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # No tiktoken or no cached encoding files: fall back to an estimate
+            _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the local tokenizer (about 4 chars/token if unavailable)."""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Keep the beginning of ``text`` that fits in ``max_tokens``."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens - 1]) + "…"
+    if len(text) <= max_tokens * 4:
+        return text
+    return text[:(max_tokens - 1) * 4] + "…"
+
+
+class MessageTokenCache:
+    """
+    LRU cache of rendered history lines and their token counts.
+
+    Entries are keyed by ``(role, content)`` so they survive the copies the
+    graph makes of the message list between nodes; each message is rendered
+    and tokenized once, however many turns it stays in the window.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, int]]" = OrderedDict()
+
+    def get(self, message: Dict[str, Any]) -> Tuple[str, int]:
+        """Return ``(line, tokens)`` for a message."""
+        role = message.get("role", "unknown")
+        content = message.get("content", "")
+        key = (role, content)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        line = f"{role}: {content}"
+        entry = (line, count_tokens(line))
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+
+_shared_cache = MessageTokenCache()
+
+
+@dataclass
+class HistoryContext:
+    """Conversation history rendered for one prompt."""
+    text: str
+    tokens: int
+    message_count: int
+    truncated: bool
+
+
+class ContextBuilder:
+    """Fits the most recent messages into a token budget."""
+
+    def __init__(self, budget_tokens: int, cache: Optional[MessageTokenCache] = None):
+        """
+        Args:
+            budget_tokens: Maximum tokens of history to send
+            cache: Line/token cache, shared across builders by default
+        """
+        self.budget_tokens = budget_tokens
+        self.cache = cache or _shared_cache
+
+    def build(self, messages: List[Dict[str, Any]]) -> HistoryContext:
+        """
+        Render the newest messages that fit in the budget, oldest first.
+
+        Walks backwards from the end and stops at the first message that does
+        not fit, so only the messages in the window are looked at. If even the
+        newest message is over budget, its beginning is kept.
+        """
+        lines: List[str] = []
+        used = 0
+        truncated = False
+
+        for message in reversed(messages):
+            line, tokens = self.cache.get(message)
+            if used + tokens > self.budget_tokens:
+                truncated = True
+                if not lines:
+                    line = truncate_to_tokens(line, self.budget_tokens)
+                    lines.append(line)
+                    used = count_tokens(line)
+                break
+            lines.append(line)
+            used += tokens
+
+        lines.reverse()
+        return HistoryContext(
+            text="\n".join(lines),
+            tokens=used,
+            message_count=len(lines),
+            truncated=truncated,
+        )
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most ``max_tokens``, on line boundaries
+    where possible.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+
+    for line in text.splitlines():
+        tokens = count_tokens(line)
+        if tokens > max_tokens:
+            # A single oversized line is cut into fixed-size pieces
+            if current:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+            while line:
+                piece = truncate_to_tokens(line, max_tokens).rstrip("…")
+                if not piece:
+                    piece = line[:max_tokens * 4]
+                chunks.append(piece)
+                line = line[len(piece):]
+            continue
+        if used + tokens > max_tokens and current:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(line)
+        used += tokens
+
+    if current:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
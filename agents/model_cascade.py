@@ -0,0 +1,250 @@
+"""Cheap-to-expensive model cascade with confidence-based escalation."""
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from langchain_core.exceptions import OutputParserException
+from pydantic import ValidationError
+
+
+# USD per million input/output tokens for models with a known list price
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+@dataclass
+class ModelTier:
+    """One model in a cascade, with its price per million tokens."""
+    name: str
+    llm: Any
+    input_cost_per_1m: float = 0.0
+    output_cost_per_1m: float = 0.0
+
+    @property
+    def priced(self) -> bool:
+        return bool(self.input_cost_per_1m or self.output_cost_per_1m)
+
+
+def tier_prices(spec: str) -> Tuple[str, float, float]:
+    """
+    Parse a tier spec, ``name`` or ``name:input_cost:output_cost`` (USD per
+    million tokens). Without explicit prices, known models use MODEL_PRICES
+    and others are left unpriced.
+
+    Returns:
+        Model name, input and output price per million tokens
+    """
+    name, *prices = spec.strip().split(":")
+    if prices:
+        input_cost, output_cost = (float(price) for price in prices)
+        return name, input_cost, output_cost
+    return (name, *MODEL_PRICES.get(name, (0.0, 0.0)))
+
+
+@dataclass
+class TierStats:
+    """Counters collected for one tier."""
+    calls: int = 0
+    unmetered_calls: int = 0
+    escalations: int = 0
+    parse_failures: int = 0
+    latency_s: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+
+
+class ModelCascade:
+    """
+    Try the cheapest tier first and escalate only when needed.
+
+    A call escalates to the next tier when structured output fails to parse or
+    validate, or when ``confidence(result)`` is below ``confidence_threshold``.
+    The last tier's answer is always accepted. Per-tier calls, escalations,
+    latency, token usage and cost are tracked in ``stats``; responses that
+    carry no usage (e.g. a tool-call stream committed before its final chunk)
+    are counted as ``unmetered_calls`` rather than silently costing nothing.
+
+    A cascade can be passed anywhere an agent accepts ``llm=``.
+    """
+
+    def __init__(self, tiers: List[ModelTier], confidence_threshold: float = 0.7):
+        if not tiers:
+            raise ValueError("A model cascade needs at least one tier")
+        self.tiers = tiers
+        self.confidence_threshold = confidence_threshold
+        self.stats: Dict[str, TierStats] = {tier.name: TierStats() for tier in tiers}
+
+    @property
+    def llm(self) -> Any:
+        """The cheapest tier's model."""
+        return self.tiers[0].llm
+
+    def _record_usage(self, tier: ModelTier, message: Any) -> None:
+        usage = getattr(message, "usage_metadata", None) or {}
+        stats = self.stats[tier.name]
+        if not usage:
+            stats.unmetered_calls += 1
+            return
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        stats.cost += (
+            input_tokens * tier.input_cost_per_1m + output_tokens * tier.output_cost_per_1m
+        ) / 1_000_000
+
+    async def ainvoke(
+        self,
+        prompt: Any,
+        inputs: Dict[str, Any],
+        parser: Any = None,
+        confidence: Optional[Callable[[Any], float]] = None,
+        on_message: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """
+        Run ``prompt`` through the cascade.
+
+        Args:
+            prompt: Prompt template to render with ``inputs``
+            inputs: Template variables
+            parser: Optional output parser; parse/validation failures escalate
+            confidence: Optional function returning the parsed result's confidence
+            on_message: Optional callback receiving every raw model response
+
+        Returns:
+            The parsed result, or the raw message when no parser is given
+        """
+        async def call(llm: Any, record: Callable[[Any], None]) -> Any:
+            message = await (prompt | llm).ainvoke(inputs)
+            record(message)
+            return parser.invoke(message) if parser is not None else message
+
+        return await self.arun(call, confidence=confidence, on_message=on_message)
+
+    async def arun(
+        self,
+        call: Callable[[Any, Callable[[Any], None]], Awaitable[Any]],
+        confidence: Optional[Callable[[Any], float]] = None,
+        on_message: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """
+        Run an arbitrary model call through the cascade.
+
+        Args:
+            call: ``call(llm, record)`` makes the request with one tier's model,
+                passes the raw response to ``record`` and returns the result;
+                raising OutputParserException or ValidationError escalates
+            confidence: Optional function returning the result's confidence
+            on_message: Optional callback receiving every raw model response
+
+        Returns:
+            The first result that parses and is confident enough (the last
+            tier's result is always accepted)
+        """
+        for position, tier in enumerate(self.tiers):
+            is_last = position == len(self.tiers) - 1
+            stats = self.stats[tier.name]
+            stats.calls += 1
+
+            def record(message: Any, tier: ModelTier = tier) -> None:
+                self._record_usage(tier, message)
+                if on_message is not None:
+                    on_message(message)
+
+            start = time.perf_counter()
+            try:
+                result = await call(tier.llm, record)
+            except (OutputParserException, ValidationError):
+                stats.parse_failures += 1
+                if is_last:
+                    raise
+                stats.escalations += 1
+                continue
+            finally:
+                stats.latency_s += time.perf_counter() - start
+
+            if (
+                confidence is not None
+                and not is_last
+                and confidence(result) < self.confidence_threshold
+            ):
+                stats.escalations += 1
+                continue
+
+            return result
+
+    async def ainvoke_tier(
+        self,
+        tier: ModelTier,
+        prompt: Any,
+        inputs: Dict[str, Any],
+        parser: Any = None,
+        on_message: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """
+        Run ``prompt`` on a single tier, tracking its stats.
+
+        For callers that escalate part of a result themselves (e.g. only the
+        unsure items of a batch); report escalations with ``escalate``.
+
+        Args:
+            tier: One of ``tiers``
+            prompt: Prompt template to render with ``inputs``
+            inputs: Template variables
+            parser: Optional output parser
+            on_message: Optional callback receiving the raw model response
+
+        Returns:
+            The parsed result, or the raw message when no parser is given
+
+        Raises:
+            OutputParserException, ValidationError: If parsing fails (counted
+                as a parse failure)
+        """
+        stats = self.stats[tier.name]
+        stats.calls += 1
+        start = time.perf_counter()
+        try:
+            message = await (prompt | tier.llm).ainvoke(inputs)
+            self._record_usage(tier, message)
+            if on_message is not None:
+                on_message(message)
+            return parser.invoke(message) if parser is not None else message
+        except (OutputParserException, ValidationError):
+            stats.parse_failures += 1
+            raise
+        finally:
+            stats.latency_s += time.perf_counter() - start
+
+    def escalate(self, tier: ModelTier) -> None:
+        """Count an escalation from ``tier`` made by an ``ainvoke_tier`` caller."""
+        self.stats[tier.name].escalations += 1
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize escalation rate, latency and cost per tier.
+
+        Tokens and cost cover metered calls only; ``unmetered_calls`` counts
+        the responses that reported no usage.
+        """
+        report = {}
+        for tier in self.tiers:
+            name, stats = tier.name, self.stats[tier.name]
+            calls = max(stats.calls, 1)
+            report[name] = {
+                "calls": stats.calls,
+                "unmetered_calls": stats.unmetered_calls,
+                "escalation_rate": stats.escalations / calls,
+                "parse_failure_rate": stats.parse_failures / calls,
+                "avg_latency_ms": stats.latency_s / calls * 1000,
+                "input_tokens": stats.input_tokens,
+                "output_tokens": stats.output_tokens,
+                "cost": stats.cost,
+                "priced": tier.priced,
+            }
+        return report
@@ -1,32 +1,72 @@
 """PDF Agent: Loads and processes PDF documents."""
+import asyncio
+import multiprocessing
 import os
 from pathlib import Path
-from typing import Optional
-from pypdf import PdfReader
-from langchain_core.prompts import ChatPromptTemplate
+from typing import Any, Dict, List, Optional
 from langchain_core.output_parsers import PydanticOutputParser
 from models.schemas import ConversationState, PDFData, AgentType, DataCollectionResult
+from models.blob_store import BlobStore
 from agents.base_agent import BaseAgent
+from agents.pdf_extraction import extract_pdf, extraction_pool
+from agents.prompt_layout import cached_prompt
 
 
 class PDFAgent(BaseAgent):
     """Agent that loads and processes PDF documents."""
     
-    def __init__(self, llm=None, pdf_directory: str = "./pdfs", **kwargs):
+    def __init__(
+        self,
+        llm=None,
+        pdf_directory: str = "./pdfs",
+        blob_store: Optional[BlobStore] = None,
+        max_concurrent_loads: int = 4,
+        process_pool: bool = True,
+        **kwargs
+    ):
+        """
+        Initialize the PDF agent.
+        
+        Args:
+            llm: Language model instance (injected dependency)
+            pdf_directory: Directory searched for relative PDF paths
+            blob_store: Optional store for extracted text; when set, state only
+                carries a handle to the text instead of the text itself
+            max_concurrent_loads: PDFs loaded at once when a message
+                mentions several
+            process_pool: Extract text in worker processes so concurrent
+                loads parse in parallel; False (or running in a daemonic
+                process) uses a thread, which only overlaps file reads
+            **kwargs: Additional configuration
+        """
         super().__init__(llm=llm, agent_type=AgentType.PDF_AGENT, **kwargs)
         self.pdf_directory = Path(pdf_directory)
+        self.blob_store = blob_store
         self.parser = PydanticOutputParser(pydantic_object=PDFData)
+        self.max_concurrent_loads = max_concurrent_loads
+        self.process_pool = process_pool
+        # Module-level so it can be sent to a worker process
+        self.extract = extract_pdf
         
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a PDF processing agent. You load PDF files and extract structured information from them.
+        self.prompt = cached_prompt(
+            """You are a PDF processing agent. You load PDF files and extract structured information from them.
 
 When a user mentions a PDF file, load it and extract the content. Provide a summary and key information.
 
-{format_instructions}"""),
-            ("human", """User input: {user_input}
+""" + self.parser.get_format_instructions(),
+            """User input: {user_input}
 
-Extract information from the PDF if mentioned, or ask the user for the PDF file path."""),
-        ])
+Extract information from the PDF if mentioned, or ask the user for the PDF file path.""",
+        )
+    
+    def resolve_path(self, file_path: str) -> Optional[Path]:
+        """Find a PDF as given or relative to ``pdf_directory``."""
+        full_path = Path(file_path)
+        if not full_path.exists():
+            # Try relative to pdf_directory
+            full_path = self.pdf_directory / file_path
+        
+        return full_path if full_path.exists() else None
     
     def load_pdf(self, file_path: str) -> Optional[PDFData]:
         """
@@ -39,70 +79,97 @@ Extract information from the PDF if mentioned, or ask the user for the PDF file
             PDFData object with extracted content, or None if error
         """
         try:
-            full_path = Path(file_path)
-            if not full_path.exists():
-                # Try relative to pdf_directory
-                full_path = self.pdf_directory / file_path
-            
-            if not full_path.exists():
+            full_path = self.resolve_path(file_path)
+            if full_path is None:
                 return None
             
-            reader = PdfReader(str(full_path))
-            text_content = ""
-            for page in reader.pages:
-                text_content += page.extract_text() + "\n"
-            
-            metadata = reader.metadata or {}
-            
-            return PDFData(
-                filename=full_path.name,
-                content=text_content,
-                metadata={
-                    "title": metadata.get("/Title", ""),
-                    "author": metadata.get("/Author", ""),
-                    "subject": metadata.get("/Subject", ""),
-                    "creator": metadata.get("/Creator", ""),
-                },
-                page_count=len(reader.pages),
-            )
+            return PDFData(**self.extract(str(full_path)))
         except Exception as e:
             print(f"Error loading PDF: {e}")
             return None
     
-    async def process(self, state: ConversationState) -> ConversationState:
-        """Process PDF loading and extraction."""
-        user_input = state.user_input.lower()
+    async def aload_pdf(self, file_path: str) -> Optional[PDFData]:
+        """
+        Load a PDF in a worker process (or thread) without blocking the event loop.
         
-        # Try to extract PDF filename from user input
-        pdf_filename = None
-        if ".pdf" in user_input:
-            # Simple extraction - look for .pdf in the input
-            words = user_input.split()
-            for word in words:
-                if word.endswith(".pdf"):
-                    pdf_filename = word.strip('"\'')
-                    break
+        Concurrent loads of the same file (same resolved path, size and
+        modification time) share one extraction.
         
-        pdf_data = None
-        if pdf_filename:
-            pdf_data = self.load_pdf(pdf_filename)
+        Args:
+            file_path: Path to the PDF file
+            
+        Returns:
+            PDFData object with extracted content, or None if error
+        """
+        full_path = self.resolve_path(file_path)
+        if full_path is None:
+            return None
         
-        if pdf_data:
-            # Store extracted PDF data
-            result = DataCollectionResult(
-                agent_type=self.agent_type,
-                data=pdf_data.model_dump(),
-                success=True,
-            )
-            state.collected_data[self.agent_type] = result
+        stat = full_path.stat()
+        key = (str(full_path.resolve()), stat.st_size, stat.st_mtime_ns)
+        return await self.deduplicated("pdf", key, lambda: self._extract(str(full_path)))
+    
+    async def _extract(self, path: str) -> Optional[PDFData]:
+        # Daemonic processes (e.g. ShardedRunner workers, already one per
+        # core) cannot start a pool of their own
+        if not self.process_pool or multiprocessing.current_process().daemon:
+            return await asyncio.to_thread(self.load_pdf, path)
+        try:
+            loop = asyncio.get_running_loop()
+            return PDFData(**await loop.run_in_executor(extraction_pool(self.max_concurrent_loads), self.extract, path))
+        except Exception as e:
+            print(f"Error loading PDF: {e}")
+            return None
+    
+    def find_references(self, user_input: str) -> List[str]:
+        """Every distinct word ending in ``.pdf``, in order of mention."""
+        references = []
+        for word in user_input.split():
+            word = word.strip('"\'`()[]<>').rstrip(".,;:!?")
+            if word.lower().endswith(".pdf") and word not in references:
+                references.append(word)
+        return references
+    
+    def stored_files(self, state: ConversationState) -> Dict[str, Dict[str, Any]]:
+        """PDFs collected in earlier turns, keyed by the reference they were loaded from."""
+        existing = state.collected_data.get(self.agent_type)
+        if existing is None:
+            return {}
+        data = existing.data if isinstance(existing, DataCollectionResult) else existing.get("data", {})
+        if "filename" in data:
+            # Single-document result from before per-file collections
+            return {data["filename"]: data}
+        return dict(data.get("files", {}))
+    
+    async def load_many(self, references: List[str]) -> Dict[str, Optional[PDFData]]:
+        """
+        Load several PDFs concurrently, at most ``max_concurrent_loads`` at a time.
+        
+        Args:
+            references: File paths as the user gave them
             
-            # Add agent response to history
-            state.messages.append({
-                "role": "assistant",
-                "content": f"PDF loaded successfully: {pdf_data.filename} ({pdf_data.page_count} pages). "
-                          f"Extracted {len(pdf_data.content)} characters of text.",
-            })
-        else:
+        Returns:
+            PDFData per reference, or None for files that are missing or unreadable
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_loads)
+        
+        async def load(reference: str) -> Optional[PDFData]:
+            async with semaphore:
+                return await self.aload_pdf(reference)
+        
+        # A missing or failing file does not hold up the others
+        loaded = await asyncio.gather(*[load(reference) for reference in references], return_exceptions=True)
+        return {
+            reference: None if isinstance(pdf_data, BaseException) else pdf_data
+            for reference, pdf_data in zip(references, loaded)
+        }
+    
+    async def process(self, state: ConversationState) -> ConversationState:
+        """Load every PDF mentioned in the input and add it to the collection."""
+        references = self.find_references(state.user_input)
+        files = self.stored_files(state)
+        
+        if not references:
             # Ask user for PDF file
             state.messages.append({
                 "role": "assistant",
@@ -110,16 +177,58 @@ Extract information from the PDF if mentioned, or ask the user for the PDF file
                           f"I'll look in {self.pdf_directory} or you can provide an absolute path.",
             })
             
-            result = DataCollectionResult(
-                agent_type=self.agent_type,
-                data={},
-                success=False,
-                error="PDF file not found or not specified",
-            )
-            state.collected_data[self.agent_type] = result
+            if not files:
+                result = DataCollectionResult(
+                    agent_type=self.agent_type,
+                    data={},
+                    success=False,
+                    error="PDF file not found or not specified",
+                )
+                self.store_result(state, result)
+            return state
+        
+        lines = []
+        missing = []
+        for reference, pdf_data in (await self.load_many(references)).items():
+            if pdf_data is None:
+                missing.append(reference)
+                lines.append(f"Could not load {reference}. I looked in {self.pdf_directory} "
+                             "and at the path as given.")
+                continue
+            
+            # Store extracted PDF data
+            data = pdf_data.model_dump()
+            if self.blob_store is not None:
+                # Keep large values out of state; agents resolve them on demand
+                data = {key: self.blob_store.offload(value) if isinstance(value, (str, list)) else value
+                        for key, value in data.items()}
+            files[reference] = data
+            lines.append(f"PDF loaded successfully: {pdf_data.filename} ({pdf_data.page_count} pages). "
+                         f"Extracted {len(pdf_data.content)} characters of text.")
+        
+        result = DataCollectionResult(
+            agent_type=self.agent_type,
+            data={"files": files, "missing": missing},
+            success=bool(files),
+            error=f"PDF file not found: {', '.join(missing)}" if missing else None,
+        )
+        self.store_result(state, result)
+        
+        # Add agent response to history
+        state.messages.append({
+            "role": "assistant",
+            "content": "\n".join(lines),
+        })
         
         return state
     
+    def store_result(self, state: ConversationState, result: DataCollectionResult) -> None:
+        """Store the collection; each document is exported as its own record."""
+        state.collected_data[self.agent_type] = result
+        for reference, data in result.data.get("files", {}).items():
+            document = DataCollectionResult(agent_type=self.agent_type, data=data, success=True)
+            self.export_result(state, document, key=f"{self.name}:{reference}")
+    
     def extract_data(self, state: ConversationState) -> DataCollectionResult:
         """Extract structured data."""
         return state.collected_data.get(self.agent_type, DataCollectionResult(
@@ -0,0 +1,74 @@
+"""
+PDF text extraction that can run in worker processes.
+
+pypdf parsing is CPU-bound and holds the GIL, so threads only overlap the
+file reads. ``extract_pdf`` is a module-level function of a module with no
+heavy imports, so it can be sent to a process pool whose workers start
+quickly; ``extraction_pool`` returns a pool shared by every PDF agent in
+the process that asks for the same number of workers.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+
+def extract_pdf(path: str) -> Dict[str, Any]:
+    """
+    Extract the text, metadata and page count of a PDF.
+
+    Args:
+        path: Path to an existing PDF file
+
+    Returns:
+        Keyword arguments for ``PDFData``
+    """
+    # pypdf is only needed once a PDF is actually requested
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    text_content = ""
+    for page in reader.pages:
+        text_content += page.extract_text() + "\n"
+
+    metadata = reader.metadata or {}
+
+    return {
+        "filename": os.path.basename(path),
+        "content": text_content,
+        "metadata": {
+            "title": metadata.get("/Title", ""),
+            "author": metadata.get("/Author", ""),
+            "subject": metadata.get("/Subject", ""),
+            "creator": metadata.get("/Creator", ""),
+        },
+        "page_count": len(reader.pages),
+    }
+
+
+def extraction_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool for PDF extraction, created on first use.
+
+    Workers are spawned rather than forked, since the parent runs an event
+    loop and threads that a fork would copy mid-operation.
+
+    Args:
+        max_workers: Worker processes; more than the CPU count still helps
+            when loads wait on slow storage
+
+    Returns:
+        The shared pool with that many workers
+    """
+    with _pool_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            pool = _pools[max_workers] = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return pool
@@ -0,0 +1,69 @@
+"""
+Prompt layout that keeps a byte-stable prefix for provider prompt caching.
+
+Providers cache prompts by exact prefix. Every prompt is therefore built as
+a literal system message (instructions, schemas, examples) that never
+changes between calls, followed by the per-turn content. ``PromptUsageTracker``
+records how many prompt tokens the provider reported as served from cache.
+"""
+import threading
+from typing import Any, Dict
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+
+def cached_prompt(static: str, dynamic: str) -> ChatPromptTemplate:
+    """
+    Build a prompt with a static prefix and a dynamic suffix.
+
+    Args:
+        static: Instructions sent verbatim as the system message; it is not
+            templated, so it is byte-identical on every call
+        dynamic: Human message template holding everything that varies
+
+    Returns:
+        Prompt template
+    """
+    return ChatPromptTemplate.from_messages([
+        SystemMessage(content=static),
+        ("human", dynamic),
+    ])
+
+
+class PromptUsageTracker:
+    """Accumulates prompt token usage, cached vs. uncached, per agent."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, message: Any) -> None:
+        """
+        Record the usage metadata of one model response.
+
+        Responses without usage (e.g. a stream closed before its final chunk)
+        are counted in ``unmetered_calls``.
+        """
+        usage = getattr(message, "usage_metadata", None) or {}
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        with self._lock:
+            stats = self._stats.setdefault(
+                agent, {"calls": 0, "unmetered_calls": 0, "input_tokens": 0, "cached_tokens": 0},
+            )
+            stats["calls"] += 1
+            if not usage:
+                stats["unmetered_calls"] += 1
+            stats["input_tokens"] += usage.get("input_tokens", 0)
+            stats["cached_tokens"] += cached
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Per-agent prompt tokens, cached tokens and cache hit ratio."""
+        with self._lock:
+            return {
+                agent: {
+                    **stats,
+                    "uncached_tokens": stats["input_tokens"] - stats["cached_tokens"],
+                    "cache_ratio": stats["cached_tokens"] / stats["input_tokens"] if stats["input_tokens"] else 0.0,
+                }
+                for agent, stats in self._stats.items()
+            }
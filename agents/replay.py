@@ -0,0 +1,200 @@
+"""
+Record/replay transport for chat models.
+
+``RecordReplayChatModel`` wraps a real model and can be passed anywhere an
+agent or graph accepts ``llm=``. In "record" mode every call goes to the
+wrapped model and the response is appended to a cassette (JSONL) under the
+hash of the rendered prompt (and the model name, so the tiers of a cascade
+can share one cassette). In "replay" mode responses are served from the
+cassette without touching the network, so end-to-end runs are fast and
+deterministic; with ``strict=True`` an unmatched prompt raises
+``CassetteMiss`` instead of falling back to the wrapped model.
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field, PrivateAttr
+
+
+class CassetteMiss(LookupError):
+    """A strict replay found no recorded response for a prompt."""
+
+
+_cassette_locks: Dict[str, threading.Lock] = {}
+_cassette_locks_guard = threading.Lock()
+
+
+def _cassette_lock(cassette: str) -> threading.Lock:
+    """One lock per cassette file, shared by every model appending to it."""
+    key = str(Path(cassette).resolve())
+    with _cassette_locks_guard:
+        return _cassette_locks.setdefault(key, threading.Lock())
+
+
+def prompt_hash(messages: List[BaseMessage], model: str = "", **kwargs: Any) -> str:
+    """SHA-256 of the rendered messages plus the model and options that change the answer."""
+    payload = {
+        "messages": [
+            [message.type, message.content, getattr(message, "tool_calls", None) or None]
+            for message in messages
+        ],
+        **{key: kwargs[key] for key in ("tools", "tool_choice", "stop") if kwargs.get(key)},
+    }
+    if model:
+        payload["model"] = model
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class RecordReplayChatModel(BaseChatModel):
+    """
+    Chat model that records responses of ``inner`` to a cassette and replays them.
+
+    Tool calls are recorded from the wrapped model's stream and replayed as
+    tool-call chunks, so tool-calling structured output works in both modes.
+    Counts of hits, misses and recordings are kept in ``stats``. ``model``
+    is part of every cassette key, so several models (e.g. the tiers of a
+    cascade) can record to and replay from one cassette without collisions.
+    """
+
+    cassette: str
+    inner: Optional[Any] = None
+    model: str = ""
+    mode: str = "replay"
+    strict: bool = True
+    stats: Dict[str, int] = Field(default_factory=lambda: {"hits": 0, "misses": 0, "recorded": 0})
+
+    _entries: Dict[str, AIMessage] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._lock = _cassette_lock(self.cassette)
+        if self.mode not in ("record", "replay"):
+            raise ValueError(f"mode must be 'record' or 'replay', not {self.mode!r}")
+        if self.mode == "record" and self.inner is None:
+            raise ValueError("Recording needs the model to record from (inner=)")
+        path = Path(self.cassette)
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        # Later recordings of the same prompt win
+                        self._entries[entry["key"]] = messages_from_dict([entry["message"]])[0]
+
+    @property
+    def _llm_type(self) -> str:
+        return "record-replay"
+
+    @property
+    def prompts(self) -> int:
+        """Number of distinct prompts in the cassette."""
+        return len(self._entries)
+
+    def bind_tools(self, tools: List[Any], tool_choice: Optional[str] = None, **kwargs: Any) -> Any:
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _lookup(self, key: str) -> Optional[AIMessage]:
+        if self.mode == "record":
+            return None
+        message = self._entries.get(key)
+        if message is not None:
+            self.stats["hits"] += 1
+            return message
+        self.stats["misses"] += 1
+        if self.strict or self.inner is None:
+            raise CassetteMiss(f"No recorded response for prompt {key[:12]} in {self.cassette}")
+        return None
+
+    def _record(self, key: str, message: BaseMessage) -> AIMessage:
+        # Store a plain AIMessage even when the response was streamed
+        message = AIMessage(
+            content=message.content,
+            tool_calls=getattr(message, "tool_calls", None) or [],
+            usage_metadata=getattr(message, "usage_metadata", None),
+            response_metadata=getattr(message, "response_metadata", None) or {},
+        )
+        line = json.dumps({"key": key, "model": self.model, "message": message_to_dict(message)}, default=str)
+        with self._lock:
+            if self._entries.get(key) == message:
+                # Unchanged answer to a prompt already on the cassette
+                return message
+            self._entries[key] = message
+            path = Path(self.cassette)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.stats["recorded"] += 1
+        return message
+
+    def _inner_runnable(self, kwargs: Dict[str, Any]) -> Any:
+        tools = kwargs.get("tools")
+        if tools:
+            return self.inner.bind_tools(tools, tool_choice=kwargs.get("tool_choice"))
+        return self.inner
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = prompt_hash(messages, model=self.model, stop=stop, **kwargs)
+        message = self._lookup(key)
+        if message is None:
+            message = self._record(key, self._inner_runnable(kwargs).invoke(messages, stop=stop))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _aresponse(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> AIMessage:
+        key = prompt_hash(messages, model=self.model, stop=stop, **kwargs)
+        message = self._lookup(key)
+        if message is not None:
+            return message
+        runnable = self._inner_runnable(kwargs)
+        if not kwargs.get("tools"):
+            return self._record(key, await runnable.ainvoke(messages, stop=stop))
+        # Tool-call arguments are only complete once the whole stream is in
+        streamed = None
+        async for chunk in runnable.astream(messages, stop=stop):
+            streamed = chunk if streamed is None else streamed + chunk
+        return self._record(key, streamed)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = await self._aresponse(messages, stop, kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        message = await self._aresponse(messages, stop, kwargs)
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content=message.content,
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call.get("id"), "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata,
+        ))
@@ -1,25 +1,23 @@
 """Router agent for intent-based routing."""
-from typing import Dict, Any
-from langchain_core.prompts import ChatPromptTemplate
+from typing import Dict, Any, Awaitable, Callable, Optional, TYPE_CHECKING
 from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.exceptions import OutputParserException
 from models.schemas import ConversationState, AgentIntent, AgentType
 from agents.base_agent import BaseAgent
+from agents.prompt_layout import cached_prompt
+from agents.structured_output import ToolCallingOutput
 
+if TYPE_CHECKING:
+    from agents.router_batcher import RoutingBatcher
+    from agents.routing_classifier import HashedNGramClassifier, RoutingLog
 
-class RouterAgent(BaseAgent):
-    """Router agent that analyzes intent and routes to appropriate agents."""
-    
-    def __init__(self, llm=None, **kwargs):
-        super().__init__(llm=llm, agent_type=None, **kwargs)
-        self.parser = PydanticOutputParser(pydantic_object=AgentIntent)
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a router agent that analyzes user intent and routes to the appropriate specialized agent.
+
+ROUTING_RULES = """You are a router agent that analyzes user intent and routes to the appropriate specialized agent.
 
 ROUTING RULES - Route based on which fields the user mentions or wants to provide:
 
 - If user mentions fields "a", "b", or "c" (or wants to provide info related to these) → route to agent_1
-- If user mentions fields "d" or "e" (or wants to provide info related to these) → route to agent_2  
+- If user mentions fields "d" or "e" (or wants to provide info related to these) → route to agent_2
 - If user mentions fields "f", "g", or "h" (or wants to provide info related to these) → route to agent_3
 - If user wants to upload or process a PDF document → route to pdf_agent
 - If user asks for a summary of collected data → route to summary_agent
@@ -34,45 +32,157 @@ Examples:
 - "upload my document.pdf" → pdf_agent
 - "give me a summary" → summary_agent
 
-Analyze the user's input carefully to determine which field(s) they want to provide.
+Analyze the user's input carefully to determine which field(s) they want to provide."""
+
 
-{format_instructions}"""),
-            ("human", """User input: {user_input}
+class RouterAgent(BaseAgent):
+    """Router agent that analyzes intent and routes to appropriate agents."""
+
+    # Routing only needs the last few turns
+    history_budget_tokens = 256
+
+    def __init__(
+        self,
+        llm=None,
+        batcher: Optional["RoutingBatcher"] = None,
+        classifier: Optional["HashedNGramClassifier"] = None,
+        classifier_threshold: float = 0.9,
+        decision_log: Optional["RoutingLog"] = None,
+        structured_output: str = "parser",
+        **kwargs
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            llm: Language model instance (injected dependency)
+            batcher: Optional shared RoutingBatcher; when set, routing requests
+                from concurrent sessions are classified together in one call
+            classifier: Optional local classifier tried before the LLM
+            classifier_threshold: Minimum classifier probability to skip the LLM
+            decision_log: Optional log that records every LLM routing decision
+            structured_output: "parser" to put format instructions in the prompt
+                and parse free text, or "tools" to use native tool calling and
+                commit as soon as intent and confidence have streamed in
+            **kwargs: Additional configuration
+        """
+        super().__init__(llm=llm, agent_type=None, **kwargs)
+        self.parser = PydanticOutputParser(pydantic_object=AgentIntent)
+        self.batcher = batcher
+        self.classifier = classifier
+        self.classifier_threshold = classifier_threshold
+        self.decision_log = decision_log
+        self.structured_output = structured_output
+        self.tool_output = ToolCallingOutput(
+            AgentIntent,
+            early_fields=("intent", "confidence"),
+            early_defaults={"reasoning": ""},
+        )
 
-Conversation history:
+        human = """Conversation history:
 {history}
 
-Determine which agent to route to based on the fields the user wants to provide."""),
-        ])
-    
+User input: {user_input}
+
+Determine which agent to route to based on the fields the user wants to provide."""
+        if structured_output == "tools":
+            # The tool schema replaces the format instructions
+            self.prompt = cached_prompt(ROUTING_RULES, human)
+        else:
+            # Format instructions are fixed for AgentIntent, so they belong in the static prefix
+            self.prompt = cached_prompt(
+                ROUTING_RULES + "\n\n" + self.parser.get_format_instructions(),
+                human,
+            )
+
+    async def classify(self, user_input: str, history: str) -> AgentIntent:
+        """
+        Classify a single routing request with its own LLM call.
+
+        Identical requests in flight at the same time share one call when a
+        SingleFlight is configured.
+
+        Args:
+            user_input: Current user input
+            history: Formatted conversation history
+
+        Returns:
+            Routing decision
+        """
+        inputs = {"user_input": user_input, "history": history}
+        if self.structured_output == "tools":
+            def record_usage(message: Any) -> None:
+                self.usage_tracker.record(self.name, message)
+            
+            def call(llm: Any, record: Callable[[Any], None]) -> Awaitable[AgentIntent]:
+                return self.tool_output.ainvoke(self.prompt, llm, inputs, on_message=record)
+            
+            if self.cascade is not None:
+                # Escalates like the parser path on invalid arguments or low confidence
+                run = lambda: self.cascade.arun(
+                    call, confidence=lambda intent: intent.confidence, on_message=record_usage,
+                )
+            else:
+                run = lambda: call(self.llm, record_usage)
+            return await self.deduplicated(
+                "llm", self.llm_key(self.prompt, inputs, "tools", AgentIntent.__name__), run,
+            )
+        return await self.invoke_llm(
+            self.prompt,
+            inputs,
+            parser=self.parser,
+            confidence=lambda intent: intent.confidence,
+            dedupe=True,
+        )
+
+    async def route_with_llm(self, user_input: str, history: str) -> AgentIntent:
+        """Get a routing decision from the LLM, batched when a batcher is set."""
+        if self.batcher is not None:
+            try:
+                intent = await self.batcher.classify(user_input, history)
+            except OutputParserException:
+                # The batch answer was unusable for this item; retry on its own
+                intent = await self.classify(user_input, history)
+        else:
+            intent = await self.classify(user_input, history)
+
+        if self.decision_log is not None:
+            self.decision_log.append(user_input, history, intent)
+        return intent
+
     async def process(self, state: ConversationState) -> ConversationState:
         """Process routing decision."""
         # Format conversation history
-        history = "\n".join([
-            f"{msg.get('role', 'unknown')}: {msg.get('content', '')}"
-            for msg in state.messages[-5:]  # Last 5 messages for context
-        ])
-        
-        # Get routing decision
-        chain = self.prompt | self.llm | self.parser
-        intent: AgentIntent = await chain.ainvoke({
-            "user_input": state.user_input,
-            "history": history or "No previous conversation",
-            "format_instructions": self.parser.get_format_instructions(),
-        })
-        
+        history = self.build_history(state) or "No previous conversation"
+
+        # Try the local classifier first, fall back to the LLM when unsure
+        intent = None
+        source = "llm"
+        if self.classifier is not None:
+            label, probability = self.classifier.predict(state.user_input)
+            if probability >= self.classifier_threshold:
+                intent = AgentIntent(
+                    intent=label,
+                    confidence=probability,
+                    reasoning="Matched by the local routing classifier.",
+                )
+                source = "classifier"
+        if intent is None:
+            intent = await self.route_with_llm(state.user_input, history)
+
         # Update state with routing decision
         state.current_agent = intent.intent
         state.context["routing_decision"] = {
             "intent": intent.intent.value,
             "confidence": intent.confidence,
             "reasoning": intent.reasoning,
+            "source": source,
         }
-        
+
         # Add router message to history
         state.messages.append({
             "role": "router",
             "content": f"Routing to {intent.intent.value} (confidence: {intent.confidence:.2f}). {intent.reasoning}",
         })
-        
+
         return state
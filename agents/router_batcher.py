@@ -0,0 +1,205 @@
+"""Micro-batching of routing requests across concurrent sessions."""
+import asyncio
+from typing import Dict, Any, List, Optional, Set, Tuple, TYPE_CHECKING
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.exceptions import OutputParserException
+from pydantic import ValidationError
+from agents.base_agent import create_llm
+from agents.model_cascade import ModelCascade
+from models.schemas import AgentIntent, AgentIntentBatch
+from agents.router_agent import ROUTING_RULES
+from agents.prompt_layout import cached_prompt
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+class RoutingBatcher:
+    """
+    Collects pending routing requests and classifies them in one LLM call.
+
+    A batch is flushed when it reaches ``max_batch_size`` or when the oldest
+    pending request has waited ``max_wait_ms``, whichever comes first. The
+    routing rules and format instructions are sent once per batch instead of
+    once per request, and each decision is fanned back out to the coroutine
+    that asked for it.
+    """
+
+    def __init__(
+        self,
+        llm: Optional["ChatOpenAI"] = None,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            llm: Language model instance (injected dependency), or a
+                ModelCascade; requests whose decision is missing or below the
+                cascade's threshold are re-sent to the next tier as a smaller
+                batch (all of them if the response fails to parse)
+            max_batch_size: Flush as soon as this many requests are pending
+            max_wait_ms: Maximum time a request waits for others to join its batch
+        """
+        self.cascade: Optional[ModelCascade] = llm if isinstance(llm, ModelCascade) else None
+        self.llm = llm or create_llm()
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.parser = PydanticOutputParser(pydantic_object=AgentIntentBatch)
+
+        self.prompt = cached_prompt(
+            ROUTING_RULES + """
+
+You will receive several independent routing requests, each from a different user.
+Classify every request on its own and return exactly one decision per request,
+using the request's index.
+
+""" + self.parser.get_format_instructions(),
+            """{requests}
+
+Return one routing decision for each of the {count} requests above.""",
+        )
+
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "failed_items": 0,
+            "escalated_items": 0,
+        }
+
+    async def classify(self, user_input: str, history: str) -> AgentIntent:
+        """
+        Queue a routing request and wait for its decision.
+
+        Args:
+            user_input: Current user input
+            history: Formatted conversation history
+
+        Returns:
+            Routing decision for this request
+
+        Raises:
+            OutputParserException: If the batch response has no usable decision
+                for this request
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((user_input, history, future))
+        self.stats["requests"] += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Send everything pending as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        # Waiters that already gave up do not need a slot in the prompt
+        batch = [item for item in batch if not item[2].done()]
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    def _format_requests(self, batch: List[Tuple[str, str, asyncio.Future]]) -> str:
+        """Render the batch as indexed request blocks."""
+        return "\n\n".join([
+            f"### Request {index}\nUser input: {user_input}\n\nConversation history:\n{history}"
+            for index, (user_input, history, _) in enumerate(batch)
+        ])
+
+    def _inputs(self, batch: List[Tuple[str, str, asyncio.Future]]) -> Dict[str, Any]:
+        return {
+            "requests": self._format_requests(batch),
+            "count": len(batch),
+        }
+
+    async def _classify_cascaded(self, batch: List[Tuple[str, str, asyncio.Future]]) -> Dict[int, Any]:
+        """
+        Classify a batch through the cascade, escalating only what needs it.
+
+        Confident decisions from a cheaper tier are kept; requests with a
+        missing or low-confidence decision go to the next tier as a smaller
+        batch. The last tier's decisions are always accepted.
+
+        Returns:
+            Decisions keyed by index in ``batch``
+        """
+        decisions: Dict[int, Any] = {}
+        unresolved = [index for index, (_, _, future) in enumerate(batch) if not future.done()]
+        tiers = self.cascade.tiers
+        for position, tier in enumerate(tiers):
+            is_last = position == len(tiers) - 1
+            sub_batch = [batch[index] for index in unresolved]
+            try:
+                result: AgentIntentBatch = await self.cascade.ainvoke_tier(
+                    tier, self.prompt, self._inputs(sub_batch), parser=self.parser,
+                )
+            except (OutputParserException, ValidationError):
+                if is_last:
+                    raise
+                self.cascade.escalate(tier)
+                continue
+
+            # Indices in the response refer to positions in the sub-batch
+            answered = {decision.index: decision for decision in result.decisions}
+            escalated = []
+            for sub_index, index in enumerate(unresolved):
+                decision = answered.get(sub_index)
+                if decision is not None and (is_last or decision.confidence >= self.cascade.confidence_threshold):
+                    decisions[index] = decision
+                else:
+                    escalated.append(index)
+            if not escalated or is_last:
+                break
+            self.cascade.escalate(tier)
+            self.stats["escalated_items"] += len(escalated)
+            unresolved = escalated
+        return decisions
+
+    async def _run_batch(self, batch: List[Tuple[str, str, asyncio.Future]]) -> None:
+        """Classify a batch and resolve every waiter's future."""
+        self.stats["batches"] += 1
+        self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+
+        try:
+            if self.cascade is not None:
+                decisions = await self._classify_cascaded(batch)
+            else:
+                result: AgentIntentBatch = await (self.prompt | self.llm | self.parser).ainvoke(self._inputs(batch))
+                decisions = {decision.index: decision for decision in result.decisions}
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for index, (_, _, future) in enumerate(batch):
+            if future.done():
+                continue
+            decision = decisions.get(index)
+            if decision is None:
+                self.stats["failed_items"] += 1
+                future.set_exception(OutputParserException(
+                    f"Batched routing response has no decision for request {index}"
+                ))
+                continue
+            future.set_result(AgentIntent(
+                intent=decision.intent,
+                confidence=decision.confidence,
+                reasoning=decision.reasoning,
+            ))
@@ -0,0 +1,245 @@
+"""
+Local routing classifier distilled from logged router decisions.
+
+Every routing decision the LLM makes is a labeled example. ``RoutingLog``
+appends them to a JSONL file, and ``HashedNGramClassifier`` learns a
+multinomial logistic regression over hashed word and character n-grams
+from that log, using NumPy only.
+
+Train from the command line:
+
+    python -m agents.routing_classifier --log routing_log.jsonl --out router_model.npz
+"""
+import argparse
+import json
+import random
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import numpy as np
+from models.schemas import AgentIntent, AgentType
+
+
+LABELS: List[AgentType] = list(AgentType)
+
+_WORD_RE = re.compile(r"[a-z0-9_.]+")
+
+
+class RoutingLog:
+    """Append-only JSONL log of routing inputs and the LLM's decisions."""
+
+    def __init__(self, path: str = "routing_log.jsonl"):
+        self.path = Path(path)
+
+    def append(self, user_input: str, history: str, intent: AgentIntent) -> None:
+        """
+        Record one routing decision.
+
+        Args:
+            user_input: Input that was routed
+            history: Conversation history the router saw
+            intent: Decision returned by the LLM
+        """
+        record = {
+            "user_input": user_input,
+            "history": history,
+            "intent": intent.intent.value,
+            "confidence": intent.confidence,
+            "reasoning": intent.reasoning,
+        }
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+class HashedNGramClassifier:
+    """Multinomial logistic regression over hashed word/char n-grams."""
+
+    def __init__(self, n_features: int = 2 ** 16):
+        self.n_features = n_features
+        self.weights = np.zeros((len(LABELS), n_features), dtype=np.float32)
+        self.bias = np.zeros(len(LABELS), dtype=np.float32)
+
+    def featurize(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hash a text into sparse feature indices and L2-normalized values.
+
+        Uses word unigrams, word bigrams and character trigrams.
+        """
+        text = text.lower()
+        words = _WORD_RE.findall(text)
+        grams = [f"w:{w}" for w in words]
+        grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        padded = f" {text} "
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+        counts: Dict[int, float] = {}
+        for gram in grams:
+            index = zlib.crc32(gram.encode("utf-8")) % self.n_features
+            counts[index] = counts.get(index, 0.0) + 1.0
+
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        norm = np.linalg.norm(values)
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    def _probabilities(self, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        logits = self.weights[:, indices] @ values + self.bias
+        logits -= logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        """Return class probabilities in ``LABELS`` order."""
+        return self._probabilities(*self.featurize(text))
+
+    def predict(self, text: str) -> Tuple[AgentType, float]:
+        """Return the most likely agent and its probability."""
+        probabilities = self.predict_proba(text)
+        best = int(probabilities.argmax())
+        return LABELS[best], float(probabilities[best])
+
+    def fit(
+        self,
+        texts: List[str],
+        labels: List[AgentType],
+        epochs: int = 10,
+        learning_rate: float = 0.5,
+        l2: float = 1e-6,
+        seed: int = 0,
+    ) -> "HashedNGramClassifier":
+        """
+        Train with per-example SGD on the cross-entropy loss.
+
+        Args:
+            texts: Routing inputs
+            labels: Agent chosen by the LLM for each input
+            epochs: Passes over the data
+            learning_rate: SGD step size
+            l2: L2 penalty applied to the touched weights
+            seed: Shuffle seed
+        """
+        examples = [self.featurize(text) for text in texts]
+        targets = [LABELS.index(AgentType(label)) for label in labels]
+        order = list(range(len(examples)))
+        rng = random.Random(seed)
+
+        for _ in range(epochs):
+            rng.shuffle(order)
+            for i in order:
+                indices, values = examples[i]
+                gradient = self._probabilities(indices, values)
+                gradient[targets[i]] -= 1.0
+                self.weights[:, indices] -= learning_rate * (
+                    np.outer(gradient, values) + l2 * self.weights[:, indices]
+                )
+                self.bias -= learning_rate * gradient
+        return self
+
+    def save(self, path: str) -> None:
+        """Save weights to an ``.npz`` file."""
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            labels=np.array([label.value for label in LABELS]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNGramClassifier":
+        """Load a classifier saved with ``save``."""
+        data = np.load(path)
+        if [str(label) for label in data["labels"]] != [label.value for label in LABELS]:
+            raise ValueError(f"Classifier at {path} was trained for a different set of agents")
+        classifier = cls(n_features=data["weights"].shape[1])
+        classifier.weights = data["weights"]
+        classifier.bias = data["bias"]
+        return classifier
+
+
+def evaluate(
+    classifier: HashedNGramClassifier,
+    records: List[Dict[str, Any]],
+    threshold: float = 0.9,
+) -> Dict[str, float]:
+    """
+    Compare the classifier with the LLM's logged decisions.
+
+    Returns:
+        Overall agreement, the fraction of inputs the classifier would answer
+        at ``threshold`` (coverage), agreement on that fraction, and mean
+        per-call latency in microseconds.
+    """
+    agree = covered = covered_agree = 0
+    elapsed = 0.0
+    for record in records:
+        start = time.perf_counter()
+        label, probability = classifier.predict(record["user_input"])
+        elapsed += time.perf_counter() - start
+
+        match = label.value == record["intent"]
+        agree += match
+        if probability >= threshold:
+            covered += 1
+            covered_agree += match
+
+    total = max(len(records), 1)
+    return {
+        "examples": len(records),
+        "agreement": agree / total,
+        "coverage": covered / total,
+        "covered_agreement": covered_agree / covered if covered else 0.0,
+        "latency_us": elapsed / total * 1e6,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Train a routing classifier from a decision log and report held-out metrics."""
+    parser = argparse.ArgumentParser(description="Train the local routing classifier.")
+    parser.add_argument("--log", default="routing_log.jsonl", help="Routing decision log (JSONL)")
+    parser.add_argument("--out", default="router_model.npz", help="Where to save the trained model")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction held out for evaluation")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    records = list(RoutingLog(args.log))
+    if not records:
+        raise SystemExit(f"No routing decisions found in {args.log}")
+
+    random.Random(args.seed).shuffle(records)
+    split = int(len(records) * (1 - args.holdout))
+    train, held_out = records[:split], records[split:]
+
+    classifier = HashedNGramClassifier().fit(
+        [r["user_input"] for r in train],
+        [r["intent"] for r in train],
+        epochs=args.epochs,
+        seed=args.seed,
+    )
+    classifier.save(args.out)
+
+    report = evaluate(classifier, held_out or train, threshold=args.threshold)
+    print(f"Trained on {len(train)} decisions, evaluated on {report['examples']}")
+    print(f"  agreement with LLM:       {report['agreement']:.1%}")
+    print(f"  coverage at p >= {args.threshold:.2f}:  {report['coverage']:.1%}")
+    print(f"  agreement when confident: {report['covered_agreement']:.1%}")
+    print(f"  latency per call:         {report['latency_us']:.1f} µs")
+    print(f"Saved model to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
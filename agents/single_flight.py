@@ -0,0 +1,105 @@
+"""
+Single-flight deduplication of identical in-flight work.
+
+When several sessions ask for the same thing at once (the same PDF, the same
+document summary, the same rendered prompt), only the first caller starts
+the work; the others await the same task. Nothing is cached: once the work
+finishes, the next caller starts it again.
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+def prompt_key(prompt: Any, inputs: Dict[str, Any]) -> str:
+    """SHA-256 of the messages a prompt template renders to."""
+    messages = prompt.format_messages(**inputs)
+    payload = json.dumps([(message.type, message.content) for message in messages], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one task.
+
+    Every caller awaits the shared task through ``asyncio.shield``, so a
+    caller that is cancelled (e.g. a session that times out) only stops
+    waiting; the work continues for the others. When the last waiter gives
+    up, the task itself is cancelled, since nobody wants its result.
+
+    Counters are kept per ``kind`` (e.g. "pdf", "llm", "summary") and
+    reported by ``report``.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, Hashable], _Flight] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _forget(self, key: Tuple[str, Hashable], flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    async def do(self, kind: str, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``fn()`` unless identical work is already in flight, then await it.
+
+        Args:
+            kind: Category used for metrics and to separate key spaces
+            key: Identity of the work, e.g. a content or prompt hash
+            fn: Starts the work; only called by the first concurrent caller
+
+        Returns:
+            The shared result; an exception from the work is raised to every waiter
+        """
+        stats = self._stats.setdefault(kind, {
+            "calls": 0, "executions": 0, "deduplicated": 0, "cancelled_waiters": 0, "abandoned": 0,
+        })
+        stats["calls"] += 1
+        flight_key = (kind, key)
+        flight = self._inflight.get(flight_key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._inflight[flight_key] = flight
+            flight.task.add_done_callback(lambda _task: self._forget(flight_key, flight))
+            stats["executions"] += 1
+        else:
+            stats["deduplicated"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.cancelled():
+                stats["cancelled_waiters"] += 1
+            raise
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # The last waiter left early; new callers must start afresh
+                flight.task.cancel()
+                self._forget(flight_key, flight)
+                stats["abandoned"] += 1
+
+    @property
+    def in_flight(self) -> int:
+        """Number of distinct tasks currently running."""
+        return len(self._inflight)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Per-kind calls, executions, deduplicated calls and dedup rate."""
+        return {
+            kind: {**stats, "dedup_rate": stats["deduplicated"] / stats["calls"] if stats["calls"] else 0.0}
+            for kind, stats in self._stats.items()
+        }
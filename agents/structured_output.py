@@ -0,0 +1,146 @@
+"""
+Structured output through native tool calling.
+
+Instead of pasting a JSON schema into the prompt and parsing free text with
+``PydanticOutputParser``, the model is forced to call a tool whose parameters
+are the pydantic schema. Streamed tool-call arguments are parsed tolerantly
+and incrementally, so a caller can commit to leading fields (such as the
+routing ``intent``) before the rest of the arguments have arrived.
+"""
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, Optional, Type
+from langchain_core.exceptions import OutputParserException
+from langchain_core.utils.json import parse_partial_json
+from pydantic import BaseModel, ValidationError
+
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_decoder = json.JSONDecoder()
+
+
+def parse_arguments(raw: str) -> Dict[str, Any]:
+    """
+    Parse possibly incomplete or slightly malformed tool-call arguments.
+
+    Handles truncated JSON (unterminated strings, missing closing braces) and
+    trailing commas. Returns ``{}`` if nothing can be recovered.
+    """
+    for candidate in (raw, _TRAILING_COMMA_RE.sub(r"\1", raw)):
+        try:
+            parsed = parse_partial_json(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return {}
+
+
+def completed_fields(raw: str, fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    Return the given fields whose values are fully present in ``raw``.
+
+    A value counts as complete once it decodes and is followed by ``,`` or
+    ``}``, so a partially streamed string or number is never committed.
+    """
+    found = {}
+    for name in fields:
+        match = re.search(r'"%s"\s*:\s*' % re.escape(name), raw)
+        if not match:
+            continue
+        try:
+            value, end = _decoder.raw_decode(raw, match.end())
+        except json.JSONDecodeError:
+            continue
+        rest = raw[end:].lstrip()
+        if rest[:1] in (",", "}"):
+            found[name] = value
+    return found
+
+
+class ToolCallingOutput:
+    """
+    Produce a pydantic object via a forced tool call.
+
+    Tracks calls, parse failures and early commits in ``stats``.
+    """
+
+    def __init__(
+        self,
+        schema: Type[BaseModel],
+        early_fields: Iterable[str] = (),
+        early_defaults: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            schema: Pydantic model the tool arguments must validate against
+            early_fields: Stop streaming as soon as all of these fields are complete
+            early_defaults: Values for fields that may not have arrived at an early commit
+        """
+        self.schema = schema
+        self.early_fields = tuple(early_fields)
+        self.early_defaults = early_defaults or {}
+        self.stats: Dict[str, int] = {"calls": 0, "parse_failures": 0, "early_commits": 0}
+
+    def bind(self, llm: Any) -> Any:
+        """Bind the schema as the only, forced tool."""
+        return llm.bind_tools([self.schema], tool_choice=self.schema.__name__)
+
+    async def ainvoke(
+        self,
+        prompt: Any,
+        llm: Any,
+        inputs: Dict[str, Any],
+        on_message: Optional[Callable[[Any], None]] = None,
+    ) -> BaseModel:
+        """
+        Stream the tool call and return the validated object.
+
+        Args:
+            prompt: Prompt template (without format instructions)
+            llm: Chat model supporting tool calling
+            inputs: Template variables
+            on_message: Optional callback receiving the aggregated message when
+                the stream completes or is cut short by an early commit; usage
+                metadata arrives on the last chunk, so an early-committed
+                message usually has none
+
+        Raises:
+            OutputParserException: If the arguments do not validate
+        """
+        self.stats["calls"] += 1
+        chain = prompt | self.bind(llm)
+        raw = ""
+        message = None
+
+        async for chunk in chain.astream(inputs):
+            message = chunk if message is None else message + chunk
+            for tool_chunk in getattr(chunk, "tool_call_chunks", None) or ():
+                raw += tool_chunk.get("args") or ""
+
+            if self.early_fields and raw:
+                early = completed_fields(raw, self.early_fields)
+                if len(early) == len(self.early_fields):
+                    # Only fields that fully arrived are used; the rest fall back to defaults
+                    done = completed_fields(raw, self.schema.model_fields)
+                    try:
+                        result = self.schema.model_validate({**self.early_defaults, **done})
+                    except ValidationError:
+                        continue
+                    self.stats["early_commits"] += 1
+                    if on_message is not None:
+                        on_message(message)
+                    # Leaving the loop closes the stream; the remaining tokens are not generated
+                    return result
+
+        if message is not None and on_message is not None:
+            on_message(message)
+
+        try:
+            return self.schema.model_validate(parse_arguments(raw))
+        except ValidationError as e:
+            self.stats["parse_failures"] += 1
+            raise OutputParserException(
+                f"Tool call arguments for {self.schema.__name__} did not validate: {e}",
+                llm_output=raw,
+            ) from e
@@ -1,57 +1,281 @@
 """Summary Agent: Provides final summary of collected data."""
-from langchain_core.prompts import ChatPromptTemplate
+import asyncio
+import hashlib
+import itertools
+import json
+from typing import Any, Dict, List, Optional
 from models.schemas import ConversationState, AgentType
+from models.blob_store import BlobStore, is_blob_handle
+from models.archive import MessageArchive
 from agents.base_agent import BaseAgent
+from agents.prompt_layout import cached_prompt
+from agents.context import count_tokens, split_into_chunks
+
+
+SUMMARY_PREFIX = "Summary:\n"
+
+
+def _fingerprint(value: Any) -> str:
+    """Stable hash of a JSON-serializable value."""
+    encoded = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _response_text(response: Any) -> str:
+    return response.content if hasattr(response, 'content') else str(response)
 
 
 class SummaryAgent(BaseAgent):
     """Agent that provides a final summary of all collected data."""
-    
-    def __init__(self, llm=None, **kwargs):
+
+    history_budget_tokens = 2048
+
+    def __init__(
+        self,
+        llm=None,
+        incremental: bool = True,
+        chunk_tokens: int = 3000,
+        max_concurrency: int = 4,
+        max_rounds: int = 3,
+        blob_store: Optional[BlobStore] = None,
+        **kwargs
+    ):
+        """
+        Initialize the summary agent.
+
+        Args:
+            llm: Language model instance (injected dependency)
+            incremental: Keep a rolling summary in state and only fold in what
+                changed since the last one, instead of starting from scratch
+            chunk_tokens: Documents longer than this are map-reduce summarized
+            max_concurrency: Maximum chunk summaries in flight at once, across
+                all documents being summarized by this agent
+            max_rounds: Most rounds of summarizing partial summaries before
+                the final reduce step
+            blob_store: Store used to resolve blob handles in collected data
+            **kwargs: Additional configuration
+        """
         super().__init__(llm=llm, agent_type=AgentType.SUMMARY_AGENT, **kwargs)
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are a summary agent that provides comprehensive summaries of all data collected by the specialized agents.
+        self.incremental = incremental
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+        self.max_rounds = max_rounds
+        # Shared by every document, so several files summarized together
+        # still keep at most max_concurrency calls in flight
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.blob_store = blob_store
+
+        self.prompt = cached_prompt(
+            """You are a summary agent that provides comprehensive summaries of all data collected by the specialized agents.
 
-Review all collected data from Agent 1, Agent 2, Agent 3, and PDF Agent, and provide a clear, structured summary."""),
-            ("human", """Collected data from all agents:
+Review all collected data from Agent 1, Agent 2, Agent 3, and PDF Agent, and provide a clear, structured summary.""",
+            """Collected data from all agents:
 {collected_data}
 
 Conversation history:
 {history}
 
-Provide a comprehensive summary of all collected information."""),
-        ])
-    
+Provide a comprehensive summary of all collected information.""",
+        )
+
+        self.update_prompt = cached_prompt(
+            """You are a summary agent that maintains a running summary of all data collected by the specialized agents.
+
+You are given the current summary and only what changed since it was written. Update the summary so it reflects everything, keeping its clear, structured format. Replace outdated values instead of listing both.""",
+            """Current summary:
+{summary}
+
+New or updated data:
+{collected_data}
+
+New conversation since the last summary:
+{history}
+
+Provide the updated summary.""",
+        )
+
+        self.map_prompt = cached_prompt(
+            "You summarize one section of a longer document. Keep names, numbers, dates and conclusions.",
+            "{chunk}",
+        )
+
+        self.reduce_prompt = cached_prompt(
+            "You combine section summaries of one document into a single concise summary of the whole document.",
+            "{summaries}",
+        )
+
+    async def summarize_document(self, content: str) -> str:
+        """
+        Map-reduce summarize a long document.
+
+        Chunks are summarized in parallel with at most ``max_concurrency``
+        calls in flight. Partial summaries that are still too long are
+        chunked and summarized again before the final reduce step, for at
+        most ``max_rounds`` rounds and only while each round shrinks the text.
+
+        Args:
+            content: Document text
+
+        Returns:
+            Summary of the document
+        """
+        async def summarize_chunk(chunk: str) -> str:
+            async with self._semaphore:
+                return _response_text(await self.invoke_llm(self.map_prompt, {"chunk": chunk}, dedupe=True))
+
+        chunks = split_into_chunks(content, self.chunk_tokens)
+        previous_tokens = count_tokens(content)
+        rounds = 0
+        while len(chunks) > 1:
+            partials = await asyncio.gather(*[summarize_chunk(chunk) for chunk in chunks])
+            combined = "\n\n".join(partials)
+            rounds += 1
+            tokens = count_tokens(combined)
+            # Stop once it fits, or when the model's summaries stop shrinking
+            if tokens <= self.chunk_tokens or tokens >= previous_tokens or rounds >= self.max_rounds:
+                break
+            previous_tokens = tokens
+            chunks = split_into_chunks(combined, self.chunk_tokens)
+        else:
+            combined = chunks[0] if chunks else ""
+
+        async with self._semaphore:
+            response = await self.invoke_llm(self.reduce_prompt, {"summaries": combined}, dedupe=True)
+        return _response_text(response)
+
+    async def _summarize_shared(self, key: str, content: str) -> str:
+        """Summarize a document once for all sessions asking for it concurrently."""
+        return await self.deduplicated("summary", key, lambda: self.summarize_document(content))
+
+    async def _condense(self, data: Dict[str, Any], documents: Dict[str, str]) -> Dict[str, Any]:
+        """Replace long document content with its (cached) map-reduce summary."""
+        files = data.get("files")
+        if isinstance(files, dict):
+            # Per-file collection (PDF agent): condense each document
+            condensed = await asyncio.gather(*[self._condense(file_data, documents) for file_data in files.values()])
+            return {**data, "files": dict(zip(files, condensed))}
+        content = data.get("content")
+        if is_blob_handle(content):
+            # The handle already identifies the content; only load it on a cache miss
+            key = content
+            if key not in documents:
+                if self.blob_store is None:
+                    return data
+                content = self.blob_store.get(key)
+                if count_tokens(content) <= self.chunk_tokens:
+                    return {**data, "content": content}
+                documents[key] = await self._summarize_shared(key, content)
+        elif isinstance(content, str) and count_tokens(content) > self.chunk_tokens:
+            key = _fingerprint(content)
+            if key not in documents:
+                documents[key] = await self._summarize_shared(key, content)
+        else:
+            return data
+
+        return {**data, "content": f"[document summary] {documents[key]}"}
+
+    async def _format_collected(self, results: List[Any], documents: Dict[str, str]) -> str:
+        blocks = []
+        for result in results:
+            data = await self._condense(result.data, documents)
+            blocks.append(f"{result.agent_type.value}:\n{data}")
+        return "\n\n".join(blocks)
+
+    def _new_messages(self, state: ConversationState, since: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Conversation added since the last summary, minus routing and summary noise.
+
+        Returns:
+            The new messages, or None if some were spilled to an archive that
+            cannot be read
+        """
+        # ``since`` counts archived messages that are no longer in state
+        archived = state.context.get("archived_messages", 0)
+        spilled: List[Dict[str, Any]] = []
+        if since < archived:
+            # Messages spilled to the archive since the last summary
+            path = state.context.get("message_archive")
+            if not path:
+                return None
+            spilled = list(itertools.islice(MessageArchive.from_path(path), since, archived))
+        messages = [
+            msg for msg in spilled + state.messages[max(since - archived, 0):]
+            if msg.get("role") != "router"
+            and not str(msg.get("content", "")).startswith(SUMMARY_PREFIX)
+        ]
+        # The user's request for this summary is not new information; in the
+        # graph it is followed by the router's message, filtered out above
+        if messages and messages[-1].get("role") == "user" and messages[-1].get("content") == state.user_input:
+            messages = messages[:-1]
+        return messages
+
     async def process(self, state: ConversationState) -> ConversationState:
         """Generate summary of all collected data."""
-        # Format collected data
-        collected_data_str = "\n\n".join([
-            f"{result.agent_type.value}:\n{result.data}"
-            for result in state.collected_data.values()
-            if result.success
-        ])
-        
-        if not collected_data_str:
-            collected_data_str = "No data has been collected yet."
-        
-        history = "\n".join([
-            f"{msg.get('role', 'unknown')}: {msg.get('content', '')}"
-            for msg in state.messages[-20:]
-        ])
-        
-        chain = self.prompt | self.llm
-        response = await chain.ainvoke({
-            "collected_data": collected_data_str,
-            "history": history or "No previous conversation",
+        successful = [result for result in state.collected_data.values() if result.success]
+        summary_state = state.context.setdefault("summary_state", {
+            "text": None,
+            "fingerprints": {},
+            "message_count": 0,
+            "documents": {},
         })
-        
+        documents = summary_state["documents"]
+
+        new_messages = None
+        if self.incremental and summary_state["text"] is not None:
+            new_messages = self._new_messages(state, summary_state["message_count"])
+
+        if new_messages is None:
+            summary_content = await self._full_summary(state, successful, documents)
+        else:
+            changed = [
+                result for result in successful
+                if summary_state["fingerprints"].get(result.agent_type.value) != _fingerprint(result.data)
+            ]
+
+            if not changed and not new_messages:
+                # Nothing happened since the last summary
+                summary_content = summary_state["text"]
+            else:
+                collected_data_str = await self._format_collected(changed, documents)
+                history = self.context_builder.build(new_messages).text
+                response = await self.invoke_llm(self.update_prompt, {
+                    "summary": summary_state["text"],
+                    "collected_data": collected_data_str or "No data changes.",
+                    "history": history or "No new conversation.",
+                })
+                summary_content = _response_text(response)
+
+        summary_state["text"] = summary_content
+        summary_state["fingerprints"] = {
+            result.agent_type.value: _fingerprint(result.data) for result in successful
+        }
+
         # Add summary to messages
-        summary_content = response.content if hasattr(response, 'content') else str(response)
         state.messages.append({
             "role": "assistant",
-            "content": f"Summary:\n{summary_content}",
+            "content": f"{SUMMARY_PREFIX}{summary_content}",
         })
-        
+        summary_state["message_count"] = state.context.get("archived_messages", 0) + len(state.messages)
+
         return state
 
+    async def _full_summary(
+        self,
+        state: ConversationState,
+        successful: List[Any],
+        documents: Dict[str, str],
+    ) -> str:
+        """Summarize everything from scratch."""
+        collected_data_str = await self._format_collected(successful, documents)
+
+        if not collected_data_str:
+            collected_data_str = "No data has been collected yet."
+
+        history = self.build_history(state)
+
+        response = await self.invoke_llm(self.prompt, {
+            "collected_data": collected_data_str,
+            "history": history or "No previous conversation",
+        })
+
+        return _response_text(response)
@@ -0,0 +1 @@
+"""Local benchmarks that run the agents against a fake LLM."""
@@ -0,0 +1,71 @@
+"""
+Stream completed results through ResultExporter and watch memory stay flat.
+
+Resident memory is sampled at every tenth of the run; with bounded buffers
+and rolling columnar files it should not grow with the record count.
+
+Run from the project root:
+
+    python -m benchmarks.export --records 1000000 --columnar parquet
+"""
+import argparse
+import os
+import tempfile
+import time
+from models.export import ResultExporter
+from models.schemas import AgentType, DataCollectionResult
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux)."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def make_results() -> list:
+    return [
+        DataCollectionResult(agent_type=AgentType.AGENT_1, success=True,
+                             data={"field_a": "alpha", "field_b": "beta", "field_c": "gamma"}),
+        DataCollectionResult(agent_type=AgentType.AGENT_2, success=True,
+                             data={"field_d": "delta", "field_e": "epsilon"}),
+        DataCollectionResult(agent_type=AgentType.AGENT_3, success=True,
+                             data={"field_f": "phi", "field_g": "gimel", "field_h": "eta"}),
+        DataCollectionResult(agent_type=AgentType.PDF_AGENT, success=True,
+                             data={"filename": "report.pdf", "content": "x" * 2000,
+                                   "metadata": {"title": "Report"}, "page_count": 3}),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--columnar", choices=("auto", "parquet", "csv"), default="auto")
+    parser.add_argument("--buffer-size", type=int, default=1000)
+    parser.add_argument("--rows-per-file", type=int, default=250_000)
+    args = parser.parse_args()
+
+    results = make_results()
+    checkpoints = {args.records * step // 10 for step in range(1, 11)}
+    with tempfile.TemporaryDirectory() as directory:
+        exporter = ResultExporter(
+            directory,
+            columnar=args.columnar,
+            buffer_size=args.buffer_size,
+            rows_per_file=args.rows_per_file,
+        )
+        print(f"format: {exporter.columnar}")
+        print(f"{'records':>10}{'RSS MB':>10}{'records/s':>12}")
+        start = time.perf_counter()
+        for i in range(1, args.records + 1):
+            exporter.emit(f"session-{i // 4}", results[i % len(results)])
+            if i in checkpoints:
+                print(f"{i:>10}{rss_mb():>10.1f}{i / (time.perf_counter() - start):>12.0f}")
+        exporter.close()
+
+        sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)}
+        print(f"{len(sizes)} files, {sum(sizes.values()) / 2 ** 20:.1f} MB written, "
+              f"{exporter.stats['inline_flushes']} of {exporter.stats['flushes']} flushes inline (backpressure)")
+
+
+if __name__ == "__main__":
+    main()
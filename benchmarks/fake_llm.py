@@ -0,0 +1,171 @@
+"""Deterministic fake chat model for offline benchmarks."""
+import asyncio
+import json
+import random
+import re
+from typing import Any, AsyncIterator, List, Optional, Set
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+_ROUTING_KEYWORDS = [
+    ("pdf", "pdf_agent"),
+    ("summary", "summary_agent"),
+    (r"\b[abc]\b", "agent_1"),
+    (r"\b[de]\b", "agent_2"),
+    (r"\b[fgh]\b", "agent_3"),
+]
+
+
+def route_by_keyword(user_input: str) -> str:
+    """Pick an agent for a user input the way a well-behaved router would."""
+    text = user_input.lower()
+    for pattern, agent in _ROUTING_KEYWORDS:
+        if re.search(pattern, text):
+            return agent
+    return "agent_1"
+
+
+def count_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers routing prompts with valid JSON and everything
+    else with a short canned reply, after a fixed simulated latency.
+
+    Prompt token usage is reported through ``usage_metadata`` and accumulated
+    on the instance so benchmarks can compare request and token counts. Like
+    provider prefix caching, a system message seen before is reported as
+    cached input tokens.
+
+    With tools bound, the routing decision is streamed back as tool-call
+    argument chunks spread evenly over ``latency``. ``truncate_rate`` is the
+    fraction of responses cut off mid-output, as when a max-token limit hits;
+    ``chatter_rate`` is the fraction of free-text answers wrapped in prose,
+    which cannot happen to tool-call arguments.
+    """
+
+    latency: float = 0.05
+    truncate_rate: float = 0.0
+    chatter_rate: float = 0.0
+    calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    seen_prefixes: Set[str] = set()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools: List[Any], tool_choice: Optional[str] = None, **kwargs: Any) -> Any:
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def _degrade(self, text: str, tools: Optional[List[dict]]) -> str:
+        """Apply the configured output defects to this call's response."""
+        rng = random.Random(self.calls)
+        if not tools and self.chatter_rate and rng.random() < self.chatter_rate:
+            text = f"Here is the routing decision:\n{text}\nLet me know if you need anything else."
+        if self.truncate_rate and rng.random() < self.truncate_rate:
+            text = text[:int(len(text) * 0.6)]
+        return text
+
+    def _respond(self, messages: List[BaseMessage], tools: Optional[List[dict]] = None) -> AIMessage:
+        prompt = "\n".join(str(message.content) for message in messages)
+        self.calls += 1
+        # Tool schemas are billed as prompt tokens too
+        input_tokens = count_tokens(prompt + (json.dumps(tools) if tools else ""))
+        self.prompt_tokens += input_tokens
+
+        cached = 0
+        if messages and messages[0].type == "system":
+            prefix = str(messages[0].content)
+            if prefix in self.seen_prefixes:
+                cached = count_tokens(prefix)
+            self.seen_prefixes.add(prefix)
+        self.cached_tokens += cached
+
+        if "### Request 0" in prompt:
+            blocks = re.findall(r"### Request (\d+)\nUser input: (.*)", prompt)
+            content = json.dumps({"decisions": [
+                {
+                    "index": int(index),
+                    "intent": route_by_keyword(user_input),
+                    "confidence": 0.9,
+                    "reasoning": "keyword match",
+                }
+                for index, user_input in blocks
+            ]})
+        elif "router agent" in prompt:
+            user_input = re.search(r"User input: (.*)", prompt).group(1)
+            content = json.dumps({
+                "intent": route_by_keyword(user_input),
+                "confidence": 0.9,
+                "reasoning": "The user mentioned fields handled by this agent, so the request is routed there.",
+            })
+        else:
+            content = "Thanks! Could you share the next field?"
+
+        content = self._degrade(content, tools)
+        output_tokens = count_tokens(content)
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": cached},
+        })
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages))])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tools = kwargs.get("tools")
+        message = self._respond(messages, tools)
+        if not tools:
+            await asyncio.sleep(self.latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=message.content, usage_metadata=message.usage_metadata,
+            ))
+            return
+
+        name = tools[0]["function"]["name"]
+        args = message.content
+        pieces = [args[i:i + 4] for i in range(0, len(args), 4)] or [""]
+        for index, piece in enumerate(pieces):
+            await asyncio.sleep(self.latency / len(pieces))
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[{
+                    "name": name if index == 0 else None,
+                    "args": piece,
+                    "id": "call_0" if index == 0 else None,
+                    "index": 0,
+                }],
+                usage_metadata=message.usage_metadata if index == len(pieces) - 1 else None,
+            ))
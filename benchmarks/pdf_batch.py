@@ -0,0 +1,119 @@
+"""
+Load several PDFs mentioned in one message concurrently.
+
+Generates text PDFs of different lengths, times each load on its own, then
+sends one message referencing all of them (plus a file that does not exist)
+to the PDF agent. With bounded concurrent loading the wall time should
+approach the slowest single load rather than the sum. ``--read-latency-ms``
+adds a per-file delay standing in for slow (e.g. network) storage. Parsing
+holds the GIL, so with threads only that delay overlaps; with the agent's
+process pool (the default) parsing runs in parallel too, given enough cores.
+
+Run from the project root:
+
+    python -m benchmarks.pdf_batch --files 8 --read-latency-ms 100
+"""
+import argparse
+import asyncio
+import functools
+import os
+import tempfile
+import time
+from typing import Any, Dict
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+from agents.pdf_agent import PDFAgent
+from agents.pdf_extraction import extract_pdf, extraction_pool
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.routing_batch import INPUTS
+from models.schemas import AgentType, ConversationState
+
+
+def write_pdf(path: str, pages: int) -> None:
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for page_number in range(pages):
+        lines = " ".join(f"({INPUTS[(page_number + i) % len(INPUTS)]}) '" for i in range(50))
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 10 Tf 12 TL 40 760 Td {lines} ET".encode("latin-1"))
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def slow_extract(read_latency: float, path: str) -> Dict[str, Any]:
+    """``extract_pdf`` on storage whose reads take an extra fixed delay."""
+    time.sleep(read_latency)
+    return extract_pdf(path)
+
+
+class SlowStoragePDFAgent(PDFAgent):
+    """PDF agent whose file reads take an extra fixed delay."""
+
+    def __init__(self, read_latency: float, **kwargs):
+        super().__init__(**kwargs)
+        # A partial of a module-level function still pickles for the process pool
+        self.extract = functools.partial(slow_extract, read_latency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the largest file")
+    parser.add_argument("--read-latency-ms", type=float, default=100.0)
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        names = [f"doc{i}.pdf" for i in range(args.files)]
+        for i, name in enumerate(names):
+            write_pdf(os.path.join(directory, name), max(1, args.pages * (i + 1) // args.files))
+
+        def agent(max_concurrent: int, process_pool: bool) -> PDFAgent:
+            return SlowStoragePDFAgent(
+                read_latency=args.read_latency_ms / 1000,
+                llm=FakeChatModel(),
+                pdf_directory=directory,
+                max_concurrent_loads=max_concurrent,
+                process_pool=process_pool,
+            )
+
+        async def single(name: str) -> float:
+            start = time.perf_counter()
+            await agent(1, process_pool=False).aload_pdf(name)
+            return (time.perf_counter() - start) * 1000
+
+        async def message(max_concurrent: int, process_pool: bool) -> tuple:
+            state = ConversationState(user_input=f"compare {' '.join(names)} and missing.pdf")
+            start = time.perf_counter()
+            state = await agent(max_concurrent, process_pool).process(state)
+            elapsed = (time.perf_counter() - start) * 1000
+            return elapsed, state.collected_data[AgentType.PDF_AGENT]
+
+        singles = [asyncio.run(single(name)) for name in names]
+        serial_ms, _ = asyncio.run(message(1, process_pool=False))
+        threads_ms, _ = asyncio.run(message(args.max_concurrent, process_pool=False))
+        # Start the pool's workers first; that is a one-off cost per process
+        list(extraction_pool(args.max_concurrent).map(extract_pdf, [os.path.join(directory, name) for name in names]))
+        processes_ms, result = asyncio.run(message(args.max_concurrent, process_pool=True))
+
+        print(f"{args.files} files, {args.read_latency_ms:.0f} ms read latency, "
+              f"{args.max_concurrent} loads at a time, {os.cpu_count()} CPU cores")
+        print(f"slowest single load:  {max(singles):8.0f} ms")
+        print(f"sum of single loads:  {sum(singles):8.0f} ms")
+        print(f"one at a time:        {serial_ms:8.0f} ms")
+        print(f"concurrent, threads:  {threads_ms:8.0f} ms")
+        print(f"concurrent, processes:{processes_ms:8.0f} ms")
+        print(f"loaded {len(result.data['files'])} files, missing: {result.data['missing']}")
+
+
+if __name__ == "__main__":
+    main()
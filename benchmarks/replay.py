@@ -0,0 +1,81 @@
+"""
+Record end-to-end conversations through the graph, then replay them offline.
+
+The first pass records every model call (made to the fake LLM, standing in
+for the live API) to a cassette; the second replays the same conversations
+in strict mode and checks that every reply is identical.
+
+Run from the project root:
+
+    python -m benchmarks.replay --conversations 300 --latency-ms 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, List
+from agents.replay import CassetteMiss, RecordReplayChatModel
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.routing_batch import INPUTS
+from graph.multi_agent_graph import create_multi_agent_graph
+from models.compact import CompactSession
+
+
+def script(i: int, turns: int) -> List[str]:
+    return [INPUTS[(i + turn) % len(INPUTS)] for turn in range(turns - 1)] + ["give me a summary"]
+
+
+async def run(llm: Any, conversations: int, turns: int, structured_output: str) -> List[List[str]]:
+    app = create_multi_agent_graph(llm=llm, structured_output=structured_output, lazy_agents=True)
+
+    async def conversation(i: int) -> List[str]:
+        session = CompactSession()
+        replies = []
+        for user_input in script(i, turns):
+            session.add_message("user", user_input)
+            state = session.to_graph_state(user_input)
+            result = await app.ainvoke(state)
+            session.update_from_graph_state(result, len(state["messages"]))
+            replies.extend(message["content"] for message in result["messages"][len(state["messages"]):])
+        return replies
+
+    return await asyncio.gather(*[conversation(i) for i in range(conversations)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Simulated live API latency")
+    parser.add_argument("--structured-output", choices=("parser", "tools"), default="parser")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cassette = os.path.join(directory, "cassette.jsonl")
+        live = FakeChatModel(latency=args.latency_ms / 1000)
+
+        recorder = RecordReplayChatModel(cassette=cassette, inner=live, mode="record")
+        start = time.perf_counter()
+        recorded = asyncio.run(run(recorder, args.conversations, args.turns, args.structured_output))
+        record_s = time.perf_counter() - start
+
+        player = RecordReplayChatModel(cassette=cassette, mode="replay", strict=True)
+        start = time.perf_counter()
+        replayed = asyncio.run(run(player, args.conversations, args.turns, args.structured_output))
+        replay_s = time.perf_counter() - start
+
+        try:
+            asyncio.run(run(player, 1, args.turns + 1, args.structured_output))
+            strict = "no miss raised"
+        except CassetteMiss:
+            strict = "unmatched prompt raised CassetteMiss"
+
+        print(f"{args.conversations} conversations x {args.turns} turns, {player.prompts} recorded prompts")
+        print(f"record: {record_s:.2f} s ({live.calls} live calls)")
+        print(f"replay: {replay_s:.2f} s ({player.stats['hits']} hits, 0 live calls)")
+        print(f"replies identical: {recorded == replayed}; strict mode: {strict}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compare per-session routing with micro-batched routing.
+
+Run from the project root:
+
+    python -m benchmarks.routing_batch --sessions 500
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import List, Optional
+from agents.router_agent import RouterAgent
+from agents.router_batcher import RoutingBatcher
+from benchmarks.fake_llm import FakeChatModel
+from models.schemas import ConversationState
+
+
+INPUTS = [
+    "I want to input a",
+    "here's my e information",
+    "I need to enter f, g",
+    "upload my document.pdf",
+    "give me a summary",
+    "let me give you c",
+]
+
+
+def p95(samples: List[float]) -> float:
+    ordered = sorted(samples)
+    return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+async def run(sessions: int, rate: float, batcher: Optional[RoutingBatcher], llm: FakeChatModel) -> dict:
+    """Fire one routing request per session at the given arrival rate (req/s)."""
+    router = RouterAgent(llm=llm, batcher=batcher)
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        state = ConversationState(user_input=random.choice(INPUTS))
+        start = time.perf_counter()
+        await router.process(state)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(sessions):
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "llm_requests": llm.calls,
+        "prompt_tokens": llm.prompt_tokens,
+        "requests_per_s": llm.calls / elapsed,
+        "p95_ms": p95(latencies) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=1000.0, help="Routing requests per second")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated LLM latency")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    random.seed(0)
+    single_llm = FakeChatModel(latency=args.latency_ms / 1000)
+    single = asyncio.run(run(args.sessions, args.rate, None, single_llm))
+
+    random.seed(0)
+    batch_llm = FakeChatModel(latency=args.latency_ms / 1000)
+    batcher = RoutingBatcher(llm=batch_llm, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+    batched = asyncio.run(run(args.sessions, args.rate, batcher, batch_llm))
+
+    print(f"{'mode':<10}{'LLM reqs':>10}{'prompt tok':>12}{'reqs/s':>10}{'p95 ms':>10}")
+    for name, r in (("single", single), ("batched", batched)):
+        print(f"{name:<10}{r['llm_requests']:>10}{r['prompt_tokens']:>12}"
+              f"{r['requests_per_s']:>10.1f}{r['p95_ms']:>10.1f}")
+    print(f"batcher stats: {batcher.stats}")
+
+
+if __name__ == "__main__":
+    main()
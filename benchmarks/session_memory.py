@@ -0,0 +1,94 @@
+"""
+Measure per-session memory of dict-form state versus CompactSession.
+
+Run from the project root:
+
+    python -m benchmarks.session_memory --sessions 10000 --messages 20
+"""
+import argparse
+import gc
+import tracemalloc
+from typing import Any, Callable, List
+from models.compact import CompactSession
+from models.schemas import DataCollectionResult, AgentType
+
+
+ROLES = ["user", "router", "assistant"]
+
+
+def _content(session: int, index: int) -> str:
+    return f"session {session} message {index}: here is my field value"
+
+
+def _collected(session: int) -> dict:
+    return {
+        AgentType.AGENT_1: DataCollectionResult(
+            agent_type=AgentType.AGENT_1,
+            data={"field_a": f"a{session}", "field_b": f"b{session}", "field_c": f"c{session}"},
+            success=True,
+        ),
+    }
+
+
+def dict_session(session: int, messages: int) -> Any:
+    """Session as main.py held it: graph dict state with per-message dicts."""
+    return {
+        "messages": [
+            {"role": ROLES[i % 3], "content": _content(session, i)}
+            for i in range(messages)
+        ],
+        "current_agent": "agent_1",
+        "collected_data": {k.value: v for k, v in _collected(session).items()},
+        "user_input": "",
+        "context": {},
+    }
+
+
+def compact_session(session: int, messages: int) -> Any:
+    compact = CompactSession()
+    for i in range(messages):
+        compact.add_message(ROLES[i % 3], _content(session, i))
+    compact.update_from_graph_state({
+        "current_agent": "agent_1",
+        "collected_data": {k.value: v.model_dump() for k, v in _collected(session).items()},
+        "context": {},
+    }, sent_messages=0)
+    return compact
+
+
+def measure(build: Callable[[int, int], Any], sessions: int, messages: int) -> int:
+    """Bytes allocated to keep ``sessions`` sessions alive."""
+    gc.collect()
+    tracemalloc.start()
+    keep: List[Any] = [build(i, messages) for i in range(sessions)]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    content_bytes = measure(
+        lambda s, m: [_content(s, i) for i in range(m)], args.sessions, args.messages
+    )
+    total_messages = args.sessions * args.messages
+
+    print(f"{args.sessions} sessions x {args.messages} messages "
+          f"(message text alone: {content_bytes / 2**20:.1f} MiB)")
+    print(f"{'form':<10}{'MiB':>10}{'B/session':>12}{'B/message*':>12}")
+    for name, build in (("dict", dict_session), ("compact", compact_session)):
+        total = measure(build, args.sessions, args.messages)
+        overhead = total - content_bytes
+        print(f"{name:<10}{total / 2**20:>10.1f}{total / args.sessions:>12.0f}"
+              f"{overhead / total_messages:>12.1f}")
+    print("* bytes per message excluding the message text itself")
+
+
+if __name__ == "__main__":
+    main()
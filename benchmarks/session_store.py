@@ -0,0 +1,96 @@
+"""
+Trade resident memory for rehydration latency with SessionStore tiering.
+
+Fills a store with idle sessions, then compresses them all and lowers the
+memory budget step by step so more of them are evicted to disk, printing
+memory after each step. It ends with the latency of rehydrating a sample of
+sessions from the warm (compressed in memory) and cold (on disk) tiers.
+
+Run from the project root:
+
+    python -m benchmarks.session_store --sessions 20000 --budgets-mb 16 8 2
+"""
+import argparse
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+from benchmarks.export import rss_mb
+from benchmarks.routing_batch import INPUTS
+from models.compact import CompactResult, CompactSession
+from models.session_store import SessionStore
+
+
+def make_session(i: int, messages: int, rng: random.Random) -> CompactSession:
+    session = CompactSession()
+    for turn in range(messages // 2):
+        session.add_message("user", f"{rng.choice(INPUTS)} (turn {turn}, ref {rng.randrange(10 ** 6)})")
+        session.add_message("assistant", f"Thanks! I have recorded that for session {i}. {rng.choice(INPUTS)}")
+    session.collected_data = {
+        "agent_1": CompactResult("agent_1", {"field_a": f"alpha-{i}", "field_b": "beta", "field_c": "gamma"}, True),
+        "agent_2": CompactResult("agent_2", {"field_d": f"delta-{i}", "field_e": "epsilon"}, True),
+    }
+    session.context = {"session_id": f"session-{i}"}
+    return session
+
+
+def percentiles(samples: list) -> str:
+    ordered = sorted(samples)
+    return f"p50 {ordered[len(ordered) // 2]:.3f} ms, p99 {ordered[int(len(ordered) * 0.99)]:.3f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=40, help="Messages per session")
+    parser.add_argument("--budgets-mb", type=float, nargs="+", default=[16, 8, 2],
+                        help="Memory budgets for compressed sessions, tried in order")
+    parser.add_argument("--sample", type=int, default=500, help="Sessions rehydrated per tier")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        # The Python heap shows what the tiers free; RSS lags behind because
+        # the allocator keeps partly used arenas and reuses them later
+        baseline = rss_mb()
+        tracemalloc.start()
+        store = SessionStore(idle_after_s=0.0, memory_budget_bytes=2 ** 62, directory=directory)
+        for i in range(args.sessions):
+            store.put(f"session-{i}", make_session(i, args.messages, rng))
+
+        print(f"{args.sessions} sessions x {args.messages} messages")
+        print(f"{'step':>16}{'RSS MB':>9}{'heap MB':>9}{'hot':>7}{'warm':>7}{'cold':>7}{'mem MB':>8}{'disk MB':>9}")
+
+        def row(step: str) -> None:
+            gc.collect()
+            r = store.report()
+            print(f"{step:>16}{rss_mb() - baseline:>9.1f}{tracemalloc.get_traced_memory()[0] / 2 ** 20:>9.1f}"
+                  f"{r['hot']:>7}{r['warm']:>7}{r['cold']:>7}"
+                  f"{r['warm_bytes'] / 2 ** 20:>8.1f}{r['cold_bytes'] / 2 ** 20:>9.1f}")
+
+        row("all live")
+        store.compact_idle()
+        row("compressed")
+        for budget in args.budgets_mb:
+            store.memory_budget_bytes = int(budget * 2 ** 20)
+            store.compact_idle()
+            row(f"budget {budget:g} MB")
+        print(f"compression ratio {store.report()['compression_ratio']:.1f}x")
+
+        # Time rehydration without tracing, which would slow it down
+        tracemalloc.stop()
+        for tier in ("warm", "cold"):
+            session_ids = [session_id for session_id in store if store.tier(session_id) == tier]
+            if not session_ids:
+                continue
+            samples = []
+            for session_id in rng.sample(session_ids, min(args.sample, len(session_ids))):
+                start = time.perf_counter()
+                store.get(session_id)
+                samples.append((time.perf_counter() - start) * 1000)
+            print(f"rehydrate from {tier}: {percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    main()
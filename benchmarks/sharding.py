@@ -0,0 +1,99 @@
+"""
+Measure turn throughput with sessions sharded across worker processes.
+
+Each turn runs the real graph (state validation, prompt rendering, routing
+and an agent) against the fake LLM, so the work is CPU-bound; throughput
+should grow with the number of workers up to the number of cores. With
+``--restart`` one worker is restarted mid-run and every session must keep
+its full history; a session on that worker also loads a PDF large enough to
+be kept in the blob store, and must still be able to summarize it after the
+restart.
+
+Run from the project root:
+
+    python -m benchmarks.sharding --workers 1 2 4 --sessions 200 --turns 5
+"""
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Any, List
+from graph.sharding import ShardedRunner
+from benchmarks.pdf_batch import write_pdf
+from benchmarks.routing_batch import INPUTS
+from models.blob_store import is_blob_handle
+
+
+def fake_graph(blob_store: Any = None) -> Any:
+    """Worker graph factory using the fake LLM."""
+    from benchmarks.fake_llm import FakeChatModel
+    from graph.multi_agent_graph import create_multi_agent_graph
+    return create_multi_agent_graph(llm=FakeChatModel(latency=0.0), blob_store=blob_store, lazy_agents=True)
+
+
+async def run(workers: int, sessions: int, turns: int, restart: bool, pdf_path: str) -> dict:
+    async with ShardedRunner(fake_graph, workers=workers) as runner:
+        session_ids = [f"session-{i}" for i in range(sessions)]
+        # A session on the restarted worker whose PDF text lives in the blob store
+        pdf_session = next(f"pdf-{i}" for i in itertools.count() if runner.worker_for(f"pdf-{i}") == 0)
+        if restart:
+            uploaded = await runner.turn(pdf_session, f"upload {pdf_path}")
+            content = uploaded["collected_data"]["pdf_agent"]["data"]["files"][pdf_path]["content"]
+            assert not is_blob_handle(content), "turn() returned an unresolved blob handle"
+
+        async def one(session_id: str, turn: int) -> int:
+            reply = await runner.turn(session_id, INPUTS[(turn + len(session_id)) % len(INPUTS)])
+            return reply["message_count"]
+
+        start = time.perf_counter()
+        for turn in range(turns):
+            if restart and turn == turns // 2:
+                await runner.restart_worker(0)
+            counts = await asyncio.gather(*[one(session_id, turn) for session_id in session_ids])
+        elapsed = time.perf_counter() - start
+
+        pdf_ok = False
+        if restart:
+            try:
+                await runner.turn(pdf_session, "give me a summary")
+                pdf_ok = True
+            except RuntimeError as e:
+                print(f"PDF session failed after the restart: {e}")
+
+        # Every turn adds a user, router and assistant message; a session that
+        # lost its state on a restart would come back short
+        return {
+            "turns_per_s": sessions * turns / elapsed,
+            "moved": runner.stats["sessions_moved"],
+            "kept": sum(count == 3 * turns for count in counts),
+            "pdf": "ok" if pdf_ok else ("lost" if restart else "-"),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=200,
+                        help="Sessions; the intact column counts those with their full history")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--restart", action="store_true", help="Restart worker 0 halfway through")
+    args = parser.parse_args()
+
+    print(f"{multiprocessing.cpu_count()} CPU cores")
+    print(f"{'workers':>8}{'turns/s':>10}{'speed-up':>10}{'moved':>8}{'intact':>8}{'pdf':>6}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory:
+        pdf_path = os.path.join(directory, "big.pdf")
+        write_pdf(pdf_path, pages=8)
+        for workers in args.workers:
+            r = asyncio.run(run(workers, args.sessions, args.turns, args.restart, pdf_path))
+            baseline = baseline or r["turns_per_s"]
+            print(f"{workers:>8}{r['turns_per_s']:>10.0f}{r['turns_per_s'] / baseline:>9.2f}x"
+                  f"{r['moved']:>8}{r['kept']:>8}{r['pdf']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare routing LLM requests with and without single-flight deduplication
+when many sessions send the same inputs at once.
+
+A fraction of sessions give up (time out) before their answer arrives; the
+sessions still waiting on the same request must get their result anyway.
+
+Run from the project root:
+
+    python -m benchmarks.single_flight --sessions 300 --give-up-rate 0.2
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Optional
+from agents.router_agent import RouterAgent
+from agents.single_flight import SingleFlight
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.routing_batch import INPUTS
+
+
+async def run(sessions: int, give_up_rate: float, latency: float, single_flight: Optional[SingleFlight]) -> dict:
+    llm = FakeChatModel(latency=latency)
+    router = RouterAgent(llm=llm, single_flight=single_flight)
+    rng = random.Random(0)
+
+    async def one(i: int) -> bool:
+        call = router.classify(INPUTS[i % len(INPUTS)], "No previous conversation")
+        if rng.random() < give_up_rate:
+            try:
+                await asyncio.wait_for(call, timeout=latency / 2)
+            except asyncio.TimeoutError:
+                return False
+        else:
+            await call
+        return True
+
+    start = time.perf_counter()
+    answered = await asyncio.gather(*[one(i) for i in range(sessions)])
+    return {
+        "llm_requests": llm.calls,
+        "answered": sum(answered),
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+        "report": single_flight.report().get("llm", {}) if single_flight else {},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--give-up-rate", type=float, default=0.2,
+                        help="Fraction of sessions that time out before the answer arrives")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated LLM latency")
+    args = parser.parse_args()
+
+    print(f"{'mode':<14}{'LLM requests':>14}{'answered':>10}{'elapsed ms':>12}")
+    for name, single_flight in (("independent", None), ("single-flight", SingleFlight())):
+        r = asyncio.run(run(args.sessions, args.give_up_rate, args.latency_ms / 1000, single_flight))
+        print(f"{name:<14}{r['llm_requests']:>14}{r['answered']:>10}{r['elapsed_ms']:>12.0f}")
+        if r["report"]:
+            print(f"  deduplicated {r['report']['deduplicated']} of {r['report']['calls']}, "
+                  f"{r['report']['cancelled_waiters']} waiters gave up, "
+                  f"{r['report']['abandoned']} requests abandoned")
+
+
+if __name__ == "__main__":
+    main()
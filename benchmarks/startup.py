@@ -0,0 +1,158 @@
+"""
+Measure cold start: import time, time to the first prompt and time to the
+first response, with eager and with fast (lazy) start-up.
+
+Every run is a fresh interpreter, so nothing is cached in ``sys.modules``.
+"Eager" is the start-up without any of this: it imports the graph, every
+agent module and the model up front and builds every agent before showing
+the prompt. "Fast" does what ``main.py`` does: it imports only ``main``,
+shows the prompt, and creates the model and runs ``main.start_runtime``
+(lazy agents plus connection pre-warming) in the background while the
+simulated user types for ``--think-ms``. "No-warm" is fast without the
+pre-warm. The fake model's first request pays ``--connect-ms`` of
+connection setup unless the connection was warmed.
+
+Run from the project root:
+
+    python -m benchmarks.startup --runs 5 --think-ms 1000 --connect-ms 300
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+
+HEAVY_MODULES = ("langgraph", "langchain_core", "langchain_openai", "openai", "pypdf", "numpy")
+
+# What an eager start-up imports before showing the prompt
+EAGER_MODULES = (
+    "graph.multi_agent_graph",
+    "agents.router_agent",
+    "agents.agent_1",
+    "agents.agent_2",
+    "agents.agent_3",
+    "agents.pdf_agent",
+    "agents.summary_agent",
+    "benchmarks.fake_llm",
+)
+
+
+def cold_model(connect_ms: float):
+    """Fake model whose first request (or pre-warm) opens a slow connection."""
+    from pydantic import PrivateAttr
+    from benchmarks.fake_llm import FakeChatModel
+
+    class Client:
+        """Stands in for the OpenAI async client that ``prewarm_llm`` uses."""
+
+        def __init__(self, model):
+            self.models = self
+            self.model = model
+
+        def with_options(self, **kwargs):
+            return self
+
+        async def list(self):
+            await self.model.connect()
+
+    class ColdConnectionChatModel(FakeChatModel):
+        connect_latency: float = 0.3
+        _connecting: Any = PrivateAttr(default=None)
+
+        @property
+        def root_async_client(self):
+            return Client(self)
+
+        async def connect(self):
+            # Concurrent requests share the one connection being opened
+            if self._connecting is None:
+                self._connecting = asyncio.ensure_future(asyncio.sleep(self.connect_latency))
+            await self._connecting
+
+        async def _agenerate(self, *args, **kwargs):
+            await self.connect()
+            return await super()._agenerate(*args, **kwargs)
+
+    return ColdConnectionChatModel(latency=0.05, connect_latency=connect_ms / 1000)
+
+
+def child(mode: str, think_ms: float, connect_ms: float) -> None:
+    """One cold start, reported as JSON on stdout."""
+    start = time.perf_counter()
+    import main
+    if mode == "eager":
+        for name in EAGER_MODULES:
+            importlib.import_module(name)
+    import_ms = (time.perf_counter() - start) * 1000
+
+    async def start_fast() -> Any:
+        # Creating the model imports LangChain, so it happens off the loop too
+        llm = await asyncio.to_thread(cold_model, connect_ms)
+        if mode == "fast":
+            return await main.start_runtime(llm=llm)
+        return await asyncio.to_thread(main.build_runtime, llm=llm)
+
+    async def session() -> dict:
+        if mode == "eager":
+            runtime = main.build_runtime(llm=cold_model(connect_ms), lazy_agents=False)
+        else:
+            task = asyncio.create_task(start_fast())
+        prompt_ms = (time.perf_counter() - start) * 1000
+
+        # The user is typing the first message
+        await asyncio.sleep(think_ms / 1000)
+        enter = time.perf_counter()
+        if mode != "eager":
+            runtime = await task
+        compact = main.CompactSession()
+        compact.add_message("user", "I want to input a")
+        await runtime.app.ainvoke(compact.to_graph_state("I want to input a"))
+        return {
+            "import_ms": import_ms,
+            "prompt_ms": prompt_ms,
+            "first_response_ms": (time.perf_counter() - enter) * 1000,
+            "modules": [name for name in HEAVY_MODULES if name in sys.modules],
+        }
+
+    print(json.dumps(asyncio.run(session())))
+
+
+def measure(mode: str, think_ms: float, connect_ms: float) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", mode,
+         "--think-ms", str(think_ms), "--connect-ms", str(connect_ms)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--think-ms", type=float, default=1000.0,
+                        help="Simulated time the user spends typing the first message")
+    parser.add_argument("--connect-ms", type=float, default=300.0,
+                        help="Simulated connection setup paid by the first model request")
+    parser.add_argument("--child", choices=("eager", "no-warm", "fast"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.think_ms, args.connect_ms)
+        return
+
+    print(f"{'mode':<8}{'import ms':>11}{'prompt ms':>11}{'1st response ms':>17}  loaded after 1st turn")
+    for mode in ("eager", "no-warm", "fast"):
+        runs = [measure(mode, args.think_ms, args.connect_ms) for _ in range(args.runs)]
+        median = {key: statistics.median(r[key] for r in runs)
+                  for key in ("import_ms", "prompt_ms", "first_response_ms")}
+        print(f"{mode:<8}{median['import_ms']:>11.0f}{median['prompt_ms']:>11.0f}"
+              f"{median['first_response_ms']:>17.0f}  {', '.join(runs[-1]['modules'])}")
+
+
+if __name__ == "__main__":
+    main()
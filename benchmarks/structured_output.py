@@ -0,0 +1,56 @@
+"""
+Compare PydanticOutputParser routing with native tool-calling routing.
+
+Run from the project root:
+
+    python -m benchmarks.structured_output --calls 300 --chatter-rate 0.05
+"""
+import argparse
+import asyncio
+import time
+from langchain_core.exceptions import OutputParserException
+from agents.router_agent import RouterAgent
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.routing_batch import INPUTS
+
+
+async def run(mode: str, calls: int, latency: float, chatter_rate: float, truncate_rate: float) -> dict:
+    llm = FakeChatModel(latency=latency, chatter_rate=chatter_rate, truncate_rate=truncate_rate)
+    router = RouterAgent(llm=llm, structured_output=mode)
+    failures = 0
+    elapsed = 0.0
+    for i in range(calls):
+        start = time.perf_counter()
+        try:
+            await router.classify(INPUTS[i % len(INPUTS)], "No previous conversation")
+        except OutputParserException:
+            failures += 1
+        elapsed += time.perf_counter() - start
+    return {
+        "prompt_tokens": llm.prompt_tokens / calls,
+        "failure_rate": failures / calls,
+        "latency_ms": elapsed / calls * 1000,
+        "early_commits": router.tool_output.stats["early_commits"],
+        "tracked_calls": router.usage_tracker.report().get("router", {}).get("calls", 0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated generation time")
+    parser.add_argument("--chatter-rate", type=float, default=0.05,
+                        help="Fraction of free-text answers wrapped in prose")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="Fraction of responses cut off mid-output")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'prompt tok/call':>16}{'parse fail':>12}{'latency ms':>12}{'early':>8}{'tracked':>9}")
+    for mode in ("parser", "tools"):
+        r = asyncio.run(run(mode, args.calls, args.latency_ms / 1000, args.chatter_rate, args.truncate_rate))
+        print(f"{mode:<8}{r['prompt_tokens']:>16.0f}{r['failure_rate']:>12.1%}"
+              f"{r['latency_ms']:>12.1f}{r['early_commits']:>8}{r['tracked_calls']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
-from .multi_agent_graph import create_multi_agent_graph
-
 __all__ = ["create_multi_agent_graph"]
 
+
+def __getattr__(name):
+    # Defer importing LangGraph until the graph is actually built
+    if name == "create_multi_agent_graph":
+        from .multi_agent_graph import create_multi_agent_graph
+        return create_multi_agent_graph
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
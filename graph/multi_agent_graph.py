@@ -1,15 +1,17 @@
 """LangGraph implementation of the multi-agent system."""
-from typing import Literal, Dict, Any, List, Optional, Annotated
+from typing import Literal, Dict, Any, Callable, List, Optional, Annotated, TYPE_CHECKING
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END
-from models.schemas import AgentType
-from agents.router_agent import RouterAgent
-from agents.agent_1 import Agent1
-from agents.agent_2 import Agent2
-from agents.agent_3 import Agent3
-from agents.pdf_agent import PDFAgent
-from agents.summary_agent import SummaryAgent
-from langchain_openai import ChatOpenAI
+from models.schemas import AgentType, ConversationState
+from agents.base_agent import BaseAgent, create_llm
+from models.blob_store import BlobStore
+from agents.prompt_layout import PromptUsageTracker
+from agents.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from agents.router_batcher import RoutingBatcher
+    from models.export import ResultExporter
 
 
 class GraphState(TypedDict):
@@ -21,111 +23,150 @@ class GraphState(TypedDict):
     context: Dict[str, Any]
 
 
-def create_multi_agent_graph(llm: ChatOpenAI = None):
+def create_multi_agent_graph(
+    llm: "ChatOpenAI" = None,
+    routing_batcher: Optional["RoutingBatcher"] = None,
+    routing_classifier=None,
+    routing_log=None,
+    agent_llms: Optional[Dict[str, Any]] = None,
+    blob_store: Optional[BlobStore] = None,
+    usage_tracker: Optional[PromptUsageTracker] = None,
+    structured_output: str = "parser",
+    lazy_agents: bool = False,
+    single_flight: Optional[SingleFlight] = None,
+    result_sink: Optional["ResultExporter"] = None,
+):
     """
     Create the multi-agent LangGraph with dependency injection.
     
     Args:
         llm: Language model instance (injected dependency)
+        routing_batcher: Optional batcher shared by every session using this
+            graph, so concurrent routing requests go out as one LLM call
+        routing_classifier: Optional local HashedNGramClassifier the router
+            consults before calling the LLM
+        routing_log: Optional RoutingLog recording LLM routing decisions
+        agent_llms: Optional per-agent models keyed by node name ("router",
+            "agent_1", ...). Values may be chat models or ModelCascades;
+            agents without an entry use ``llm``
+        blob_store: Store for large values such as PDF text; state carries
+            handles instead. Defaults to a memory-only store that never
+            spills or drops blobs; pass one with a ``directory`` to bound
+            memory, and call its ``prune`` to drop unreferenced blobs
+        usage_tracker: Optional tracker shared by all agents that records
+            cached vs. uncached prompt tokens
+        structured_output: "parser" or "tools"; how the router obtains its
+            routing decision from the model
+        lazy_agents: Import and construct each agent on its first dispatch
+            instead of up front, so a session that never asks for a PDF
+            never loads the PDF agent
+        single_flight: Deduplicates identical concurrent PDF extractions,
+            document summaries and cacheable LLM calls across the sessions
+            using this graph. Defaults to a new SingleFlight
+        result_sink: Optional ResultExporter that agents stream newly
+            completed results to
         
     Returns:
         Compiled LangGraph
     """
     # Initialize LLM if not provided
     if llm is None:
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
-    
-    # Initialize agents with dependency injection
-    router = RouterAgent(llm=llm)
-    agent1 = Agent1(llm=llm)
-    agent2 = Agent2(llm=llm)
-    agent3 = Agent3(llm=llm)
-    pdf_agent = PDFAgent(llm=llm)
-    summary_agent = SummaryAgent(llm=llm)
-    
-    # Wrapper functions to handle dict state
-    async def router_node(state: GraphState) -> GraphState:
-        from models.schemas import ConversationState
-        conv_state = ConversationState(**state)
-        result = await router.process(conv_state)
-        return {
-            "messages": result.messages,
-            "current_agent": result.current_agent.value if result.current_agent else None,
-            "collected_data": {k.value: v.model_dump() for k, v in result.collected_data.items()},
-            "user_input": result.user_input,
-            "context": result.context,
-        }
+        llm = create_llm()
+    agent_llms = agent_llms or {}
+    if blob_store is None:
+        blob_store = BlobStore()
+    if usage_tracker is None:
+        usage_tracker = PromptUsageTracker()
+    if single_flight is None:
+        single_flight = SingleFlight()
     
-    async def agent1_node(state: GraphState) -> GraphState:
-        from models.schemas import ConversationState
-        conv_state = ConversationState(**state)
-        result = await agent1.process(conv_state)
-        return {
-            "messages": result.messages,
-            "current_agent": result.current_agent.value if result.current_agent else None,
-            "collected_data": {k.value: v.model_dump() for k, v in result.collected_data.items()},
-            "user_input": result.user_input,
-            "context": result.context,
-        }
+    # Services every agent shares
+    shared = {
+        "usage_tracker": usage_tracker,
+        "single_flight": single_flight,
+        "result_sink": result_sink,
+    }
     
-    async def agent2_node(state: GraphState) -> GraphState:
-        from models.schemas import ConversationState
-        conv_state = ConversationState(**state)
-        result = await agent2.process(conv_state)
-        return {
-            "messages": result.messages,
-            "current_agent": result.current_agent.value if result.current_agent else None,
-            "collected_data": {k.value: v.model_dump() for k, v in result.collected_data.items()},
-            "user_input": result.user_input,
-            "context": result.context,
-        }
+    # Agent factories; each imports its agent module only when called
+    def make_router() -> BaseAgent:
+        from agents.router_agent import RouterAgent
+        return RouterAgent(
+            llm=agent_llms.get("router", llm),
+            batcher=routing_batcher,
+            classifier=routing_classifier,
+            decision_log=routing_log,
+            structured_output=structured_output,
+            **shared,
+        )
     
-    async def agent3_node(state: GraphState) -> GraphState:
-        from models.schemas import ConversationState
-        conv_state = ConversationState(**state)
-        result = await agent3.process(conv_state)
-        return {
-            "messages": result.messages,
-            "current_agent": result.current_agent.value if result.current_agent else None,
-            "collected_data": {k.value: v.model_dump() for k, v in result.collected_data.items()},
-            "user_input": result.user_input,
-            "context": result.context,
-        }
+    def make_agent1() -> BaseAgent:
+        from agents.agent_1 import Agent1
+        return Agent1(llm=agent_llms.get("agent_1", llm), **shared)
     
-    async def pdf_agent_node(state: GraphState) -> GraphState:
-        from models.schemas import ConversationState
-        conv_state = ConversationState(**state)
-        result = await pdf_agent.process(conv_state)
-        return {
-            "messages": result.messages,
-            "current_agent": result.current_agent.value if result.current_agent else None,
-            "collected_data": {k.value: v.model_dump() for k, v in result.collected_data.items()},
-            "user_input": result.user_input,
-            "context": result.context,
-        }
+    def make_agent2() -> BaseAgent:
+        from agents.agent_2 import Agent2
+        return Agent2(llm=agent_llms.get("agent_2", llm), **shared)
     
-    async def summary_agent_node(state: GraphState) -> GraphState:
-        from models.schemas import ConversationState
-        conv_state = ConversationState(**state)
-        result = await summary_agent.process(conv_state)
-        return {
-            "messages": result.messages,
-            "current_agent": result.current_agent.value if result.current_agent else None,
-            "collected_data": {k.value: v.model_dump() for k, v in result.collected_data.items()},
-            "user_input": result.user_input,
-            "context": result.context,
-        }
+    def make_agent3() -> BaseAgent:
+        from agents.agent_3 import Agent3
+        return Agent3(llm=agent_llms.get("agent_3", llm), **shared)
+    
+    def make_pdf_agent() -> BaseAgent:
+        from agents.pdf_agent import PDFAgent
+        return PDFAgent(
+            llm=agent_llms.get("pdf_agent", llm),
+            blob_store=blob_store,
+            **shared,
+        )
+    
+    def make_summary_agent() -> BaseAgent:
+        from agents.summary_agent import SummaryAgent
+        return SummaryAgent(
+            llm=agent_llms.get("summary_agent", llm),
+            blob_store=blob_store,
+            **shared,
+        )
+    
+    factories: Dict[str, Callable[[], BaseAgent]] = {
+        "router": make_router,
+        "agent_1": make_agent1,
+        "agent_2": make_agent2,
+        "agent_3": make_agent3,
+        "pdf_agent": make_pdf_agent,
+        "summary_agent": make_summary_agent,
+    }
+    agents: Dict[str, BaseAgent] = {}
+    
+    def get_agent(name: str) -> BaseAgent:
+        agent = agents.get(name)
+        if agent is None:
+            agent = agents[name] = factories[name]()
+        return agent
+    
+    if not lazy_agents:
+        for name in factories:
+            get_agent(name)
+    
+    # Wrapper to handle dict state
+    def make_node(name: str) -> Callable[[GraphState], Any]:
+        async def node(state: GraphState) -> GraphState:
+            conv_state = ConversationState(**state)
+            result = await get_agent(name).process(conv_state)
+            return {
+                "messages": result.messages,
+                "current_agent": result.current_agent.value if result.current_agent else None,
+                "collected_data": {k.value: v.model_dump() for k, v in result.collected_data.items()},
+                "user_input": result.user_input,
+                "context": result.context,
+            }
+        return node
     
     # Create the graph with TypedDict state
     workflow = StateGraph(GraphState)
     
     # Add nodes
-    workflow.add_node("router", router_node)
-    workflow.add_node("agent_1", agent1_node)
-    workflow.add_node("agent_2", agent2_node)
-    workflow.add_node("agent_3", agent3_node)
-    workflow.add_node("pdf_agent", pdf_agent_node)
-    workflow.add_node("summary_agent", summary_agent_node)
+    for name in factories:
+        workflow.add_node(name, make_node(name))
     
     # Define routing function
     def route_after_router(state: GraphState) -> Literal["agent_1", "agent_2", "agent_3", "pdf_agent", "summary_agent", "__end__"]:
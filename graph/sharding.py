@@ -0,0 +1,520 @@
+"""
+Sharded execution of sessions across worker processes.
+
+Validation, prompt rendering and PDF parsing are CPU-bound and serialize on
+the GIL, so one process cannot use more than one core. ``ShardedRunner``
+starts N worker processes, each with its own compiled graph and session
+store, and routes every session to one of them through a consistent-hash
+ring. Turns of one session always run on the same worker, one at a time.
+
+When a worker is restarted, only the sessions that hash to it move: they
+are handed to their interim owners while it is down and pulled back once it
+rejoins. A moved session takes the blobs it references (e.g. PDF text) with
+it, so its new owner can resolve them. Sessions held by a worker that
+crashed are lost and start over.
+Within a worker, idle sessions can be compressed and evicted to disk by a
+``SessionStore``; blobs spill to disk past the same memory budget, and
+ones no session references any more are dropped.
+"""
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import multiprocessing
+import pickle
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class WorkerLost(RuntimeError):
+    """A worker process died while a request to it was in flight."""
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    """Maps keys to nodes so that adding or removing a node moves few keys."""
+
+    def __init__(self, nodes: Iterable[int] = (), replicas: int = 64):
+        """
+        Args:
+            nodes: Initial node ids
+            replicas: Virtual points per node; more points spread keys more evenly
+        """
+        self.replicas = replicas
+        self._ring: List[Tuple[int, int]] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> List[int]:
+        return sorted({node for _, node in self._ring})
+
+    def add(self, node: int) -> None:
+        for replica in range(self.replicas):
+            bisect.insort(self._ring, (_hash(f"{node}:{replica}"), node))
+
+    def remove(self, node: int) -> None:
+        self._ring = [point for point in self._ring if point[1] != node]
+
+    def node_for(self, key: str) -> int:
+        if not self._ring:
+            raise LookupError("The hash ring has no nodes")
+        index = bisect.bisect(self._ring, (_hash(key), -1)) % len(self._ring)
+        return self._ring[index][1]
+
+
+def build_default_graph(blob_store: Any = None) -> Any:
+    """Graph factory used by workers when none is given."""
+    from graph.multi_agent_graph import create_multi_agent_graph
+    return create_multi_agent_graph(blob_store=blob_store, lazy_agents=True)
+
+
+def _worker_main(
+    worker_id: int,
+    graph_factory: Callable[[], Any],
+    requests: Any,
+    responses: Any,
+    archive_dir: Optional[str],
+    window_size: int,
+    replicas: int,
+    store_options: Dict[str, Any],
+    blob_dir: Optional[str],
+) -> None:
+    if blob_dir is not None:
+        asyncio.run(_serve(
+            worker_id, graph_factory, requests, responses, archive_dir, window_size, replicas, store_options, blob_dir,
+        ))
+        return
+    # Without a spill directory, blobs spill to one private to this process
+    with tempfile.TemporaryDirectory(prefix=f"blobs-worker-{worker_id}-") as directory:
+        asyncio.run(_serve(
+            worker_id, graph_factory, requests, responses, archive_dir, window_size, replicas, store_options, directory,
+        ))
+
+
+async def _serve(
+    worker_id: int,
+    graph_factory: Callable[[], Any],
+    requests: Any,
+    responses: Any,
+    archive_dir: Optional[str],
+    window_size: int,
+    replicas: int,
+    store_options: Dict[str, Any],
+    blob_dir: str,
+) -> None:
+    """Worker loop: run turns concurrently, hand sessions off on request."""
+    from models.archive import MessageArchive
+    from models.blob_store import BlobStore, iter_blob_handles
+    from models.compact import CompactSession
+    from models.session_store import SessionStore
+
+    # Blobs live in this process; handed-off sessions carry theirs along
+    blob_store = BlobStore(directory=blob_dir, max_memory_bytes=store_options["memory_budget_bytes"])
+    # Blobs left on disk by an earlier process belong to no live session
+    blob_store.prune(())
+    app = graph_factory(blob_store=blob_store)
+    idle_after_s = store_options.get("idle_after_s")
+    sessions = SessionStore(**{
+        **store_options,
+        "idle_after_s": float("inf") if idle_after_s is None else idle_after_s,
+    })
+    locks: Dict[str, asyncio.Lock] = {}
+    # Blob handles each session's state references, to know which blobs to keep
+    session_blobs: Dict[str, Set[str]] = {}
+    running = set()
+    loop = asyncio.get_running_loop()
+
+    def referenced_blobs(session: Any) -> Set[str]:
+        handles = set(iter_blob_handles(session.context))
+        for result in session.collected_data.values():
+            handles.update(iter_blob_handles(result.data))
+        return handles
+
+    def snapshot(value: Any) -> str:
+        return json.dumps(value, sort_keys=True, default=str)
+
+    def pack(session: Any) -> bytes:
+        """Pickle a session together with the blobs its state references."""
+        blobs = {}
+        for handle in referenced_blobs(session):
+            try:
+                blobs[handle] = blob_store.get(handle)
+            except KeyError:
+                # Already unresolvable here; the new owner cannot do better
+                continue
+        return pickle.dumps((session, blobs))
+
+    def unpack(data: bytes) -> Any:
+        session, blobs = pickle.loads(data)
+        for value in blobs.values():
+            # Content-addressed, so the value comes back under the same handle
+            blob_store.put(value)
+        return session
+
+    async def turn(request_id: int, session_id: str, user_input: str, resolve_blobs: bool) -> None:
+        async with locks.setdefault(session_id, asyncio.Lock()):
+            session = sessions.get(session_id)
+            if session is None:
+                archive = MessageArchive(archive_dir, session_id) if archive_dir else None
+                session = CompactSession(archive=archive, window_size=window_size)
+                session.context["session_id"] = session_id
+                sessions.put(session_id, session)
+            session.add_message("user", user_input)
+            state = session.to_graph_state(user_input)
+            sent = len(state["messages"])
+            before = {key: snapshot(value) for key, value in state["collected_data"].items()}
+            try:
+                result = await app.ainvoke(state)
+            except Exception as e:
+                responses.put((worker_id, request_id, False, repr(e)))
+                return
+            session.update_from_graph_state(result, sent)
+            session_blobs[session_id] = referenced_blobs(session)
+            # Handles only resolve in this process, so send the values of data
+            # that changed this turn; unchanged documents are not re-sent
+            collected_data = {
+                key: blob_store.resolve_all(value) if resolve_blobs or snapshot(value) != before.get(key) else value
+                for key, value in result.get("collected_data", {}).items()
+            }
+            responses.put((worker_id, request_id, True, {
+                "messages": result["messages"][sent:],
+                "current_agent": result.get("current_agent"),
+                "collected_data": collected_data,
+                "message_count": session.archived_count + len(session.messages),
+            }))
+
+    def prune_blobs() -> None:
+        # A running turn may have stored blobs its session does not reference yet
+        if not running:
+            blob_store.prune(set().union(*session_blobs.values()))
+
+    async def sweep() -> None:
+        # Compress sessions that went idle (ones mid-turn stay live) and drop
+        # blobs no session references any more
+        while True:
+            await asyncio.sleep(30.0 if idle_after_s is None else min(idle_after_s / 2, 30.0))
+            if idle_after_s is not None:
+                sessions.compact_idle(busy={session_id for session_id, lock in locks.items() if lock.locked()})
+            prune_blobs()
+
+    sweeper = asyncio.create_task(sweep())
+    responses.put((worker_id, None, True, "ready"))
+    while True:
+        kind, request_id, *args = await loop.run_in_executor(None, requests.get)
+        if kind == "turn":
+            task = asyncio.create_task(turn(request_id, *args))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            continue
+
+        # Control messages act on the whole store; let running turns finish first
+        if running:
+            await asyncio.gather(*running)
+        try:
+            if kind == "handoff":
+                # Give up every session that the new ring assigns to another
+                # worker (all of them if this worker is not on it)
+                ring = ConsistentHashRing(args[0], replicas)
+                moved = {
+                    session_id: pack(sessions.pop(session_id))
+                    for session_id in list(sessions)
+                    if worker_id not in args[0] or ring.node_for(session_id) != worker_id
+                }
+                for session_id in moved:
+                    locks.pop(session_id, None)
+                    session_blobs.pop(session_id, None)
+                prune_blobs()
+                responses.put((worker_id, request_id, True, moved))
+            elif kind == "adopt":
+                for session_id, data in args[0].items():
+                    session = unpack(data)
+                    session_blobs[session_id] = referenced_blobs(session)
+                    sessions.put(session_id, session)
+                responses.put((worker_id, request_id, True, len(args[0])))
+            elif kind == "report":
+                responses.put((worker_id, request_id, True, sessions.report()))
+            elif kind == "stop":
+                responses.put((worker_id, request_id, True, len(sessions)))
+                return
+        except Exception as e:
+            responses.put((worker_id, request_id, False, repr(e)))
+
+
+class ShardedRunner:
+    """
+    Front end that hashes session ids to worker processes.
+
+    Use as ``async with ShardedRunner(...) as runner: await runner.turn(...)``.
+    A background monitor respawns workers that die; turns that were in
+    flight on them fail with ``WorkerLost``.
+    """
+
+    def __init__(
+        self,
+        graph_factory: Callable[[], Any] = build_default_graph,
+        workers: Optional[int] = None,
+        replicas: int = 64,
+        archive_dir: Optional[str] = None,
+        window_size: int = 50,
+        monitor_interval_s: float = 0.5,
+        idle_after_s: Optional[float] = None,
+        memory_budget_bytes: int = 256 * 2 ** 20,
+        spill_dir: Optional[str] = None,
+    ):
+        """
+        Args:
+            graph_factory: Module-level function returning a compiled graph;
+                called once in every worker with that worker's ``blob_store``
+                keyword, which the graph must use (it must be picklable)
+            workers: Number of worker processes (defaults to the CPU count)
+            replicas: Virtual points per worker on the hash ring
+            archive_dir: Optional directory for spilled messages, shared by
+                all workers so a moved session keeps its archive
+            window_size: In-state message window per session
+            monitor_interval_s: How often to check for dead workers
+            idle_after_s: Compress sessions idle this long; None keeps every
+                session live
+            memory_budget_bytes: Per-worker budget for compressed sessions
+                before the least recently used are evicted to ``spill_dir``,
+                and separately for blobs (e.g. PDF text) before they spill
+            spill_dir: Directory for evicted sessions and spilled blobs (one
+                subdirectory per worker); without one compressed sessions stay
+                in memory and blobs spill to a temporary directory
+        """
+        self.graph_factory = graph_factory
+        self.workers = workers or multiprocessing.cpu_count()
+        self.replicas = replicas
+        self.archive_dir = archive_dir
+        self.window_size = window_size
+        self.monitor_interval_s = monitor_interval_s
+        self.idle_after_s = idle_after_s
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = spill_dir
+        self.ring = ConsistentHashRing(replicas=replicas)
+        self.stats: Dict[str, int] = {"turns": 0, "rebalances": 0, "sessions_moved": 0, "workers_lost": 0}
+
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[int, Any] = {}
+        self._requests: Dict[int, Any] = {}
+        self._responses: Any = None
+        self._pending: Dict[int, Tuple[int, "asyncio.Future[Any]"]] = {}
+        self._ready: Dict[int, "asyncio.Future[Any]"] = {}
+        self._ids = itertools.count()
+        self._open = asyncio.Event()
+        self._rebalance = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._monitor: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        """Spawn the workers and wait until each has built its graph."""
+        self._loop = asyncio.get_running_loop()
+        self._responses = self._context.Queue()
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+        self._reader.start()
+        await asyncio.gather(*[self._spawn(worker_id) for worker_id in range(self.workers)])
+        for worker_id in range(self.workers):
+            self.ring.add(worker_id)
+        self._monitor = asyncio.create_task(self._watch())
+        self._open.set()
+
+    async def close(self) -> None:
+        """Stop the workers; sessions are discarded."""
+        self._open.clear()
+        if self._monitor is not None:
+            self._monitor.cancel()
+        await asyncio.gather(*[self._stop(worker_id) for worker_id in list(self._processes)])
+        self._responses.put(None)
+        await asyncio.to_thread(self._reader.join)
+
+    async def __aenter__(self) -> "ShardedRunner":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def worker_for(self, session_id: str) -> int:
+        return self.ring.node_for(session_id)
+
+    async def turn(self, session_id: str, user_input: str, resolve_blobs: bool = False) -> Dict[str, Any]:
+        """
+        Run one turn of a session on its worker.
+
+        Args:
+            session_id: Session to run the turn in
+            user_input: The user's message
+            resolve_blobs: Resolve blob handles in all collected data; by
+                default only data that changed during this turn is resolved
+                and the rest keeps its handles, which resolve only in the worker
+
+        Returns:
+            The turn's new messages, the current agent, collected data and
+            the session's total message count
+
+        Raises:
+            WorkerLost: If the worker died during the turn
+            RuntimeError: If the graph raised in the worker
+        """
+        await self._open.wait()
+        self.stats["turns"] += 1
+        return await self._call(self.ring.node_for(session_id), "turn", session_id, user_input, resolve_blobs)
+
+    async def session_report(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Session tiering per worker: live, compressed and evicted session
+        counts, bytes held and rehydration latency (see ``SessionStore.report``).
+        """
+        await self._open.wait()
+        nodes = self.ring.nodes
+        reports = await asyncio.gather(*[self._call(worker_id, "report") for worker_id in nodes])
+        return dict(zip(nodes, reports))
+
+    async def restart_worker(self, worker_id: int) -> None:
+        """
+        Restart one worker without losing its sessions.
+
+        Its sessions move to their next owner on the ring while it is down and
+        move back when it rejoins; sessions of other workers stay put.
+        """
+        async with self._rebalance:
+            self._open.clear()
+            try:
+                await self._drain()
+                others = [node for node in self.ring.nodes if node != worker_id]
+                moved = await self._call(worker_id, "handoff", others)
+                await self._stop(worker_id)
+                self.ring.remove(worker_id)
+                if others:
+                    await self._adopt(moved)
+                    moved = {}
+                # With no other worker, the sessions wait here for the restart
+                await self._rejoin(worker_id, moved)
+            finally:
+                self._open.set()
+
+    # Internals
+
+    async def _spawn(self, worker_id: int) -> None:
+        self._ready[worker_id] = self._loop.create_future()
+        self._requests[worker_id] = self._context.Queue()
+        store_options = {
+            "idle_after_s": self.idle_after_s,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "directory": f"{self.spill_dir}/worker-{worker_id}" if self.spill_dir else None,
+        }
+        blob_dir = f"{self.spill_dir}/worker-{worker_id}/blobs" if self.spill_dir else None
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                worker_id, self.graph_factory, self._requests[worker_id], self._responses,
+                self.archive_dir, self.window_size, self.replicas, store_options, blob_dir,
+            ),
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker_id] = process
+        await self._ready[worker_id]
+
+    async def _stop(self, worker_id: int) -> None:
+        process = self._processes.pop(worker_id)
+        if process.is_alive():
+            await self._call(worker_id, "stop")
+        await asyncio.to_thread(process.join)
+
+    async def _rejoin(self, worker_id: int, held: Optional[Dict[str, bytes]] = None) -> None:
+        """Put a (re)started worker back on the ring and pull its sessions back."""
+        if worker_id not in self._processes:
+            await self._spawn(worker_id)
+        self.ring.add(worker_id)
+        nodes = self.ring.nodes
+        handed = await asyncio.gather(*[
+            self._call(other, "handoff", nodes) for other in nodes if other != worker_id
+        ])
+        moved = dict(held or {})
+        for sessions in handed:
+            moved.update(sessions)
+        await self._adopt(moved)
+        self.stats["rebalances"] += 1
+
+    async def _adopt(self, moved: Dict[str, bytes]) -> None:
+        """Send handed-off sessions to their owners on the current ring."""
+        by_owner: Dict[int, Dict[str, bytes]] = {}
+        for session_id, data in moved.items():
+            by_owner.setdefault(self.ring.node_for(session_id), {})[session_id] = data
+        await asyncio.gather(*[
+            self._call(owner, "adopt", sessions) for owner, sessions in by_owner.items()
+        ])
+        self.stats["sessions_moved"] += len(moved)
+
+    async def _drain(self) -> None:
+        futures = [future for _, future in self._pending.values()]
+        if futures:
+            await asyncio.wait(futures)
+
+    def _call(self, worker_id: int, kind: str, *args: Any) -> "asyncio.Future[Any]":
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = (worker_id, future)
+        self._requests[worker_id].put((kind, request_id, *args))
+        return future
+
+    def _read_responses(self) -> None:
+        """Forward worker responses to the event loop (runs in a thread)."""
+        while True:
+            item = self._responses.get()
+            if item is None:
+                return
+            self._loop.call_soon_threadsafe(self._resolve, *item)
+
+    def _resolve(self, worker_id: int, request_id: Optional[int], ok: bool, payload: Any) -> None:
+        if request_id is None:
+            ready = self._ready.get(worker_id)
+            if ready is not None and not ready.done():
+                ready.set_result(None)
+            return
+        _, future = self._pending.pop(request_id, (None, None))
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(f"Worker {worker_id}: {payload}"))
+
+    def _fail_pending(self, worker_id: int) -> None:
+        for request_id, (owner, future) in list(self._pending.items()):
+            if owner == worker_id:
+                del self._pending[request_id]
+                if not future.done():
+                    future.set_exception(WorkerLost(f"Worker {worker_id} exited"))
+
+    async def _watch(self) -> None:
+        """Respawn workers that died and fail their in-flight requests."""
+        lost = set()
+        while True:
+            await asyncio.sleep(self.monitor_interval_s)
+            for worker_id, process in list(self._processes.items()):
+                if not process.is_alive():
+                    # Fail waiters right away, even mid-rebalance, so nothing hangs
+                    del self._processes[worker_id]
+                    lost.add(worker_id)
+                    self.stats["workers_lost"] += 1
+                    self._fail_pending(worker_id)
+            if not lost or self._rebalance.locked():
+                continue
+            async with self._rebalance:
+                self._open.clear()
+                try:
+                    for worker_id in sorted(lost):
+                        self.ring.remove(worker_id)
+                    for worker_id in sorted(lost):
+                        await self._rejoin(worker_id)
+                        lost.discard(worker_id)
+                finally:
+                    self._open.set()
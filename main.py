@@ -1,11 +1,13 @@
 """Main application entry point."""
 import asyncio
 import os
-from typing import Dict, Any
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from models.schemas import ConversationState, AgentType, DataCollectionResult
-from graph.multi_agent_graph import create_multi_agent_graph
+from models.compact import CompactSession
+from models.archive import MessageArchive
 
 # Load environment variables
 load_dotenv()
@@ -60,33 +62,191 @@ def state_to_dict(state: ConversationState) -> Dict[str, Any]:
     }
 
 
+def strict_replay() -> bool:
+    """Whether the environment asks for a strict cassette replay (no live model)."""
+    return (
+        bool(os.getenv("LLM_CASSETTE"))
+        and os.getenv("LLM_CASSETTE_MODE", "replay") == "replay"
+        and os.getenv("LLM_CASSETTE_STRICT", "1") != "0"
+    )
+
+
+@dataclass
+class Runtime:
+    """Everything a session needs that is expensive to set up."""
+    llm: Any
+    app: Any
+    cascade: Any = None
+    usage_tracker: Any = None
+    single_flight: Any = None
+    exporter: Any = None
+    prewarm: Any = None
+
+
+def build_runtime(api_key: Optional[str] = None, llm: Any = None, lazy_agents: bool = True) -> Runtime:
+    """
+    Create the models and the multi-agent graph from the environment.
+
+    All heavy imports (LangGraph, LangChain, the OpenAI SDK) happen here
+    rather than at module import, so the prompt can be shown first.
+
+    Args:
+        api_key: OpenAI API key
+        llm: Optional model to use instead of creating one from the environment
+        lazy_agents: Construct agents on first dispatch
+
+    Returns:
+        Runtime holding the compiled graph
+    """
+    from agents.base_agent import create_llm, DEFAULT_MODEL
+    from agents.model_cascade import ModelCascade, ModelTier, tier_prices
+    from agents.prompt_layout import PromptUsageTracker
+    from agents.single_flight import SingleFlight
+    from models.blob_store import BlobStore
+    from graph.multi_agent_graph import create_multi_agent_graph
+    
+    # Optional record/replay cassette, e.g. LLM_CASSETTE=cassettes/e2e.jsonl;
+    # it wraps every model (cascade tiers included), and a strict replay
+    # never creates a live one
+    cassette = os.getenv("LLM_CASSETTE")
+    
+    def replayable(inner: Any, name: str = "") -> Any:
+        if not cassette:
+            return inner
+        from agents.replay import RecordReplayChatModel
+        return RecordReplayChatModel(
+            cassette=cassette,
+            inner=inner,
+            model=name,
+            mode=os.getenv("LLM_CASSETTE_MODE", "replay"),
+            strict=os.getenv("LLM_CASSETTE_STRICT", "1") != "0",
+        )
+    
+    def model_for(name: str) -> Any:
+        return replayable(None if strict_replay() else create_llm(model=name, api_key=api_key), name)
+    
+    # Initialize LLM with dependency injection
+    llm = model_for(os.getenv("OPENAI_MODEL", DEFAULT_MODEL)) if llm is None else replayable(llm)
+    
+    # Optional cheap-to-expensive cascade for routing and field collection,
+    # e.g. MODEL_TIERS="gpt-4o-mini,gpt-4o"; unknown models can be priced
+    # inline as name:input_cost:output_cost (USD per million tokens)
+    cascade = None
+    agent_llms = {}
+    if os.getenv("MODEL_TIERS"):
+        cascade = ModelCascade(
+            [
+                ModelTier(
+                    name=name,
+                    llm=model_for(name),
+                    input_cost_per_1m=input_cost,
+                    output_cost_per_1m=output_cost,
+                )
+                for name, input_cost, output_cost in map(tier_prices, os.getenv("MODEL_TIERS").split(","))
+            ],
+            confidence_threshold=float(os.getenv("CASCADE_CONFIDENCE", "0.7")),
+        )
+        agent_llms = {name: cascade for name in ("router", "agent_1", "agent_2", "agent_3")}
+    
+    # Optional local routing classifier and decision log
+    routing_classifier = None
+    routing_log = None
+    if os.getenv("ROUTER_MODEL_PATH"):
+        from agents.routing_classifier import HashedNGramClassifier
+        routing_classifier = HashedNGramClassifier.load(os.getenv("ROUTER_MODEL_PATH"))
+    if os.getenv("ROUTING_LOG_PATH"):
+        from agents.routing_classifier import RoutingLog
+        routing_log = RoutingLog(os.getenv("ROUTING_LOG_PATH"))
+    
+    usage_tracker = PromptUsageTracker()
+    single_flight = SingleFlight()
+    blob_store = BlobStore(directory=os.getenv("BLOB_STORE_DIR", ".blob_store"))
+    
+    # Optional streaming export of completed results, e.g. EXPORT_DIR=exports
+    exporter = None
+    if os.getenv("EXPORT_DIR"):
+        from models.export import ResultExporter
+        exporter = ResultExporter(
+            os.getenv("EXPORT_DIR"),
+            columnar=os.getenv("EXPORT_COLUMNAR", "auto"),
+            blob_store=blob_store,
+        )
+    
+    # Create the multi-agent graph
+    app = create_multi_agent_graph(
+        llm=llm,
+        routing_classifier=routing_classifier,
+        routing_log=routing_log,
+        agent_llms=agent_llms,
+        blob_store=blob_store,
+        usage_tracker=usage_tracker,
+        single_flight=single_flight,
+        result_sink=exporter,
+        structured_output=os.getenv("STRUCTURED_OUTPUT", "parser"),
+        lazy_agents=lazy_agents,
+    )
+    
+    return Runtime(
+        llm=llm,
+        app=app,
+        cascade=cascade,
+        usage_tracker=usage_tracker,
+        single_flight=single_flight,
+        exporter=exporter,
+    )
+
+
+async def start_runtime(**kwargs) -> Runtime:
+    """
+    Build the runtime off the event loop and start pre-warming the model
+    connection in the background.
+
+    The runtime is returned as soon as the graph is built; the first turn
+    never waits for the warm-up (``runtime.prewarm``), which on a slow
+    endpoint could take until its timeout.
+
+    Args:
+        **kwargs: Passed to ``build_runtime``
+
+    Returns:
+        Ready runtime
+    """
+    from agents.base_agent import prewarm_llm
+    
+    runtime = await asyncio.to_thread(build_runtime, **kwargs)
+    runtime.prewarm = asyncio.create_task(prewarm_llm(runtime.cascade or runtime.llm))
+    return runtime
+
+
 async def main():
     """Main application loop."""
-    # Check for API key
+    # Check for API key; a strict cassette replay never calls the live model
     api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    if not api_key and not strict_replay():
         print("Error: OPENAI_API_KEY not found in environment variables.")
         print("Please set it in your .env file or environment.")
         return
     
-    # Initialize LLM with dependency injection
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0.7,
+    # Imports, graph construction and the first connection happen in the
+    # background while the user types the first message
+    runtime_task = asyncio.create_task(start_runtime(
         api_key=api_key,
-    )
+        lazy_agents=os.getenv("LAZY_AGENTS", "1") != "0",
+    ))
     
-    # Create the multi-agent graph
-    app = create_multi_agent_graph(llm=llm)
-    
-    # Initialize conversation state as dictionary
-    state_dict = {
-        "messages": [],
-        "current_agent": None,
-        "collected_data": {},
-        "user_input": "",
-        "context": {},
-    }
+    # Conversation state is kept compact between turns and expanded to the
+    # graph's dict form only for the duration of a turn
+    # Messages beyond the window are spilled to an on-disk archive
+    session_id = f"session-{os.getpid()}-{int(time.time())}"
+    session = CompactSession(
+        archive=MessageArchive(
+            os.getenv("MESSAGE_ARCHIVE_DIR", ".session_archive"),
+            session_id=session_id,
+        ),
+        window_size=int(os.getenv("MESSAGE_WINDOW", "50")),
+    )
+    # Tags exported results with the session they came from
+    session.context["session_id"] = session_id
     
     print("🤖 Multi-Agent Data Collection System")
     print("=" * 50)
@@ -95,26 +255,54 @@ async def main():
     print()
     
     while True:
-        # Get user input
-        user_input = input("You: ").strip()
+        # Get user input off the event loop so background start-up keeps running
+        user_input = (await asyncio.to_thread(input, "You: ")).strip()
         
         if user_input.lower() in ["exit", "quit"]:
+            runtime = runtime_task.result() if runtime_task.done() and not runtime_task.exception() else None
+            cascade = runtime.cascade if runtime else None
+            if cascade is not None:
+                print("Model cascade:")
+                for tier, stats in cascade.report().items():
+                    cost = f", ${stats['cost']:.4f}" if stats["priced"] else ""
+                    unmetered = stats["unmetered_calls"]
+                    print(f"  {tier}: {stats['calls']} calls, "
+                          f"{stats['escalation_rate']:.0%} escalated, "
+                          f"{stats['avg_latency_ms']:.0f} ms avg{cost}"
+                          + (f" ({unmetered} calls without usage)" if unmetered else ""))
+            usage = runtime.usage_tracker.report() if runtime else {}
+            if usage:
+                print("Prompt tokens (cached / total):")
+                for agent_name, stats in usage.items():
+                    unmetered = stats["unmetered_calls"]
+                    print(f"  {agent_name}: {stats['cached_tokens']} / {stats['input_tokens']} "
+                          f"({stats['cache_ratio']:.0%} cached"
+                          + (f", {unmetered} of {stats['calls']} calls without usage)" if unmetered else ")"))
+            dedup = runtime.single_flight.report() if runtime else {}
+            if dedup:
+                print("Deduplicated in-flight work:")
+                for kind, stats in dedup.items():
+                    print(f"  {kind}: {stats['deduplicated']} of {stats['calls']} calls shared "
+                          f"({stats['abandoned']} abandoned)")
+            if runtime and runtime.exporter is not None:
+                runtime.exporter.close()
+                print(f"Exported {runtime.exporter.stats['records']} results to {runtime.exporter.directory}")
             print("Goodbye!")
             break
         
         if not user_input:
             continue
         
+        runtime = await runtime_task
+        
         # Update state with user input
-        state_dict["user_input"] = user_input
-        state_dict["messages"].append({
-            "role": "user",
-            "content": user_input,
-        })
+        session.add_message("user", user_input)
+        state_dict = session.to_graph_state(user_input)
         
         # Run the graph
         try:
-            result = await app.ainvoke(state_dict)
+            result = await runtime.app.ainvoke(state_dict)
+            session.update_from_graph_state(result, len(state_dict["messages"]))
             state_dict = result  # LangGraph returns a dict
             
             # Display the last assistant message
@@ -136,7 +324,10 @@ async def main():
                         success = result_data.success
                         data = result_data.data
                     status = "✓" if success else "✗"
-                    print(f"  {status} {agent_type}: {len(data)} fields")
+                    if "files" in data:
+                        print(f"  {status} {agent_type}: {len(data['files'])} files")
+                    else:
+                        print(f"  {status} {agent_type}: {len(data)} fields")
                 print()
             
         except Exception as e:
@@ -1,5 +1,7 @@
 from .schemas import (
     AgentIntent,
+    BatchedAgentIntent,
+    AgentIntentBatch,
     DataCollectionResult,
     Agent1Data,
     Agent2Data,
@@ -11,6 +13,8 @@ from .schemas import (
 
 __all__ = [
     "AgentIntent",
+    "BatchedAgentIntent",
+    "AgentIntentBatch",
     "DataCollectionResult",
     "Agent1Data",
     "Agent2Data",
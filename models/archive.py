@@ -0,0 +1,59 @@
+"""Append-only on-disk archive for messages spilled out of a session window."""
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class MessageArchive:
+    """
+    One JSONL file per session holding messages older than the in-state window.
+
+    Writes only append; reads stream the file lazily, so neither depends on
+    keeping the archived messages in memory.
+    """
+
+    def __init__(self, directory: str, session_id: str):
+        """
+        Args:
+            directory: Directory holding the archive files (created if missing)
+            session_id: Session identifier, used as the file name
+        """
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)
+        self.directory = Path(directory)
+        self.path = self.directory / f"{safe_id}.jsonl"
+        self._count: Optional[int] = None
+
+    @classmethod
+    def from_path(cls, path: str) -> "MessageArchive":
+        """Open an existing archive file, e.g. one named in graph state."""
+        path = Path(path)
+        return cls(str(path.parent), path.stem)
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = sum(1 for _ in self._lines())
+        return self._count
+
+    def append(self, messages: List[Dict[str, Any]]) -> None:
+        """Append messages, oldest first."""
+        if not messages:
+            return
+        count = len(self)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.writelines(json.dumps(message, default=str) + "\n" for message in messages)
+        self._count = count + len(messages)
+
+    def _lines(self) -> Iterator[str]:
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Lazily yield archived messages, oldest first."""
+        for line in self._lines():
+            yield json.loads(line)
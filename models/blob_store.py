@@ -0,0 +1,146 @@
+"""Content-addressed store for large values referenced from graph state."""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+
+BLOB_HANDLE_PREFIX = "blob:sha256:"
+
+
+def is_blob_handle(value: Any) -> bool:
+    """Whether ``value`` is a handle returned by ``BlobStore.put``."""
+    return isinstance(value, str) and value.startswith(BLOB_HANDLE_PREFIX)
+
+
+def iter_blob_handles(value: Any) -> Iterator[str]:
+    """Yield every blob handle nested in dicts, lists and tuples of ``value``."""
+    if is_blob_handle(value):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from iter_blob_handles(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from iter_blob_handles(item)
+
+
+class BlobStore:
+    """
+    Keeps large values (PDF text, page lists) out of graph state.
+
+    Values are JSON-encoded and addressed by their SHA-256, so state only
+    carries a short handle and identical documents are stored once. Blobs
+    live in memory up to ``max_memory_bytes``; beyond that the least
+    recently used ones are spilled to ``directory``. Without a directory the
+    store is memory-only and nothing is spilled. Blobs are never dropped on
+    their own; ``prune`` removes the ones no longer referenced.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_memory_bytes: int = 256 * 2 ** 20):
+        """
+        Args:
+            directory: Where to spill blobs; without one everything stays in
+                memory (``max_memory_bytes`` is then not enforced)
+            max_memory_bytes: In-memory budget before spilling to disk
+        """
+        self.directory = Path(directory) if directory else None
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest
+
+    def put(self, value: Any) -> str:
+        """Store a JSON-serializable value and return its handle."""
+        data = json.dumps(value).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+            elif not (self.directory and self._path(digest).exists()):
+                self._memory[digest] = data
+                self._memory_bytes += len(data)
+                self._spill()
+        return BLOB_HANDLE_PREFIX + digest
+
+    def get(self, handle: str) -> Any:
+        """
+        Load the value behind a handle.
+
+        Raises:
+            KeyError: If the blob is unknown to this store
+        """
+        digest = handle[len(BLOB_HANDLE_PREFIX):]
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+        if data is None:
+            if not self.directory or not self._path(digest).exists():
+                raise KeyError(handle)
+            data = self._path(digest).read_bytes()
+        return json.loads(data)
+
+    def offload(self, value: Any, min_bytes: int = 4096) -> Any:
+        """Return a handle for large strings/lists, or the value itself if small."""
+        if isinstance(value, str) and len(value) < min_bytes:
+            return value
+        if isinstance(value, list) and sum(len(str(item)) for item in value) < min_bytes:
+            return value
+        return self.put(value)
+
+    def resolve(self, value: Any) -> Any:
+        """Return the stored value if ``value`` is a handle, else ``value`` itself."""
+        return self.get(value) if is_blob_handle(value) else value
+
+    def resolve_all(self, value: Any) -> Any:
+        """Copy of ``value`` with every nested handle replaced by its stored value."""
+        if isinstance(value, dict):
+            return {key: self.resolve_all(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.resolve_all(item) for item in value]
+        return self.resolve(value)
+
+    def prune(self, referenced: Iterable[str]) -> int:
+        """
+        Drop every blob, in memory or on disk, whose handle is not in ``referenced``.
+
+        Args:
+            referenced: Handles still in use, e.g. collected from live sessions
+                with ``iter_blob_handles``
+
+        Returns:
+            Number of blobs dropped
+        """
+        keep = {handle[len(BLOB_HANDLE_PREFIX):] for handle in referenced if is_blob_handle(handle)}
+        dropped = 0
+        with self._lock:
+            for digest in [digest for digest in self._memory if digest not in keep]:
+                self._memory_bytes -= len(self._memory.pop(digest))
+                dropped += 1
+            if self.directory is not None and self.directory.exists():
+                for path in self.directory.glob("*/*"):
+                    if path.suffix != ".tmp" and path.name not in keep:
+                        path.unlink(missing_ok=True)
+                        dropped += 1
+        return dropped
+
+    def _spill(self) -> None:
+        """Move least recently used blobs to disk until under the memory budget."""
+        if self.directory is None:
+            return
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            digest, data = self._memory.popitem(last=False)
+            self._memory_bytes -= len(data)
+            path = self._path(digest)
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_bytes(data)
+                os.replace(tmp, path)
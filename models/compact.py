@@ -0,0 +1,228 @@
+"""
+Compact in-memory representation of session state.
+
+Long-lived sessions are kept in this form between turns and converted to the
+dict form the graph and API use only at the edge (``to_graph_state`` /
+``update_from_graph_state``).
+"""
+import itertools
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional
+from models.archive import MessageArchive
+
+
+class RoleTable:
+    """Interns role names to small integer ids shared by every session."""
+
+    def __init__(self, roles: tuple = ("user", "assistant", "router", "system")):
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        for role in roles:
+            self.id_for(role)
+
+    def id_for(self, role: str) -> int:
+        role_id = self._ids.get(role)
+        if role_id is None:
+            if len(self._names) >= 255:
+                raise ValueError("Too many distinct message roles")
+            role_id = len(self._names)
+            self._names.append(sys.intern(role))
+            self._ids[role] = role_id
+        return role_id
+
+    def name(self, role_id: int) -> str:
+        return self._names[role_id]
+
+
+ROLES = RoleTable()
+
+
+class Message:
+    """One message; a lightweight view over a MessageStore entry."""
+
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"role": self.role, "content": self.content}
+
+
+class MessageStore:
+    """
+    Conversation history stored as a byte array of role ids plus a list of
+    content strings, instead of one dict per message.
+
+    Messages with keys other than ``role``/``content`` keep their extras in a
+    sparse side table so round-tripping through dicts is lossless.
+    """
+
+    __slots__ = ("_roles", "_contents", "_extras")
+
+    def __init__(self, messages: Optional[List[Dict[str, Any]]] = None):
+        self._roles = array("B")
+        self._contents: List[str] = []
+        self._extras: Optional[Dict[int, Dict[str, Any]]] = None
+        for message in messages or ():
+            self.append_dict(message)
+
+    def append(self, role: str, content: str) -> None:
+        self._roles.append(ROLES.id_for(role))
+        self._contents.append(content)
+
+    def append_dict(self, message: Dict[str, Any]) -> None:
+        self.append(message.get("role", "unknown"), message.get("content", ""))
+        extras = {k: v for k, v in message.items() if k not in ("role", "content")}
+        if extras:
+            if self._extras is None:
+                self._extras = {}
+            self._extras[len(self._contents) - 1] = extras
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def __getitem__(self, index: int) -> Message:
+        return Message(ROLES.name(self._roles[index]), self._contents[index])
+
+    def __iter__(self) -> Iterator[Message]:
+        for index in range(len(self._contents)):
+            yield self[index]
+
+    def pop_oldest(self, count: int) -> List[Dict[str, Any]]:
+        """Remove the ``count`` oldest messages and return them in dict form."""
+        count = min(count, len(self._contents))
+        removed = self.to_dicts(0, count)
+        del self._roles[:count]
+        del self._contents[:count]
+        if self._extras:
+            self._extras = {
+                index - count: extras for index, extras in self._extras.items() if index >= count
+            } or None
+        return removed
+
+    def to_dicts(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Dict form of the messages in ``[start, stop)``."""
+        messages = []
+        stop = len(self._contents) if stop is None else stop
+        for index in range(start, stop):
+            message = {"role": ROLES.name(self._roles[index]), "content": self._contents[index]}
+            if self._extras and index in self._extras:
+                message.update(self._extras[index])
+            messages.append(message)
+        return messages
+
+
+class CompactResult:
+    """Slotted equivalent of a dumped DataCollectionResult."""
+
+    __slots__ = ("agent_type", "data", "success", "error")
+
+    def __init__(self, agent_type: str, data: Dict[str, Any], success: bool, error: Optional[str] = None):
+        self.agent_type = sys.intern(agent_type)
+        self.data = data
+        self.success = success
+        self.error = error
+
+    @classmethod
+    def from_dict(cls, value: Dict[str, Any]) -> "CompactResult":
+        agent_type = value.get("agent_type")
+        agent_type = getattr(agent_type, "value", agent_type)
+        return cls(agent_type, value.get("data") or {}, value.get("success", False), value.get("error"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent_type": self.agent_type,
+            "data": self.data,
+            "success": self.success,
+            "error": self.error,
+        }
+
+
+class CompactSession:
+    """
+    Session state held between turns in compact form.
+
+    With an archive, only the newest ``window_size`` messages are kept in
+    state; older ones are spilled to the archive in batches, so memory and
+    per-turn cost stay flat however long the session runs.
+    """
+
+    __slots__ = ("messages", "current_agent", "collected_data", "context", "archive", "window_size")
+
+    def __init__(self, archive: Optional[MessageArchive] = None, window_size: int = 50):
+        """
+        Args:
+            archive: Where to spill messages that leave the window; without
+                one the full history is kept in memory
+            window_size: Messages kept in state when an archive is set
+        """
+        self.messages = MessageStore()
+        self.current_agent: Optional[str] = None
+        self.collected_data: Dict[str, CompactResult] = {}
+        self.context: Dict[str, Any] = {}
+        self.archive = archive
+        self.window_size = window_size
+
+    @property
+    def archived_count(self) -> int:
+        return len(self.archive) if self.archive is not None else 0
+
+    def _spill(self) -> None:
+        """Move the oldest messages to the archive once the window overflows."""
+        if self.archive is None:
+            return
+        # Spill in batches so the archive file is not touched on every turn
+        if len(self.messages) >= self.window_size + max(1, self.window_size // 4):
+            self.archive.append(self.messages.pop_oldest(len(self.messages) - self.window_size))
+
+    def add_message(self, role: str, content: str) -> None:
+        self.messages.append(role, content)
+        self._spill()
+
+    def iter_messages(self) -> Iterator[Dict[str, Any]]:
+        """Lazily yield the full history: archived messages, then the window."""
+        archived = iter(self.archive) if self.archive is not None else iter(())
+        return itertools.chain(archived, self.messages.to_dicts())
+
+    def to_graph_state(self, user_input: str = "") -> Dict[str, Any]:
+        """
+        Expand to the dict state the graph expects.
+
+        Only the in-state window is included; ``context["archived_messages"]``
+        tells agents how many older messages precede it and
+        ``context["message_archive"]`` where to read them.
+        """
+        self.context["archived_messages"] = self.archived_count
+        if self.archive is not None:
+            self.context["message_archive"] = str(self.archive.path)
+        return {
+            "messages": self.messages.to_dicts(),
+            "current_agent": self.current_agent,
+            "collected_data": {key: result.to_dict() for key, result in self.collected_data.items()},
+            "user_input": user_input,
+            "context": self.context,
+        }
+
+    def update_from_graph_state(self, state: Dict[str, Any], sent_messages: int) -> None:
+        """
+        Fold a graph result back in.
+
+        Args:
+            state: Dict state returned by the graph
+            sent_messages: Number of messages that were passed to the graph;
+                only messages after that are appended
+        """
+        for message in state.get("messages", [])[sent_messages:]:
+            self.messages.append_dict(message)
+        self._spill()
+        current_agent = state.get("current_agent")
+        self.current_agent = sys.intern(current_agent) if isinstance(current_agent, str) else None
+        self.collected_data = {
+            sys.intern(getattr(key, "value", key)): CompactResult.from_dict(value)
+            if isinstance(value, dict) else CompactResult.from_dict(value.model_dump())
+            for key, value in state.get("collected_data", {}).items()
+        }
+        self.context = state.get("context", {})
@@ -0,0 +1,321 @@
+"""
+Streaming export of completed data collection results.
+
+Agents hand every newly completed ``DataCollectionResult`` to a
+``ResultExporter`` as it happens, so nothing ever rescans session state.
+Records are buffered (bounded) and flushed periodically to an append-only
+JSONL file and to one columnar file set per agent type: Parquet when
+pyarrow is installed, CSV otherwise.
+"""
+import csv
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel
+from models.schemas import AgentType, DataCollectionResult, Agent1Data, Agent2Data, Agent3Data, PDFData
+from models.blob_store import BlobStore, is_blob_handle
+
+
+# Columns of each agent's columnar export
+RESULT_SCHEMAS: Dict[AgentType, Type[BaseModel]] = {
+    AgentType.AGENT_1: Agent1Data,
+    AgentType.AGENT_2: Agent2Data,
+    AgentType.AGENT_3: Agent3Data,
+    AgentType.PDF_AGENT: PDFData,
+}
+
+_pyarrow = None
+
+
+def _get_pyarrow() -> Any:
+    """Import pyarrow once; ``False`` if it is not installed."""
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            _pyarrow = pyarrow
+        except ImportError:
+            _pyarrow = False
+    return _pyarrow
+
+
+def _cell(value: Any, annotation: Any) -> Any:
+    """Flatten a value into a scalar matching its field type."""
+    if value is None:
+        return None
+    if annotation in (int, float, bool):
+        try:
+            return annotation(value)
+        except (TypeError, ValueError):
+            return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+class _ColumnarFile:
+    """Rolling Parquet or CSV output for one agent type."""
+
+    def __init__(
+        self,
+        directory: Path,
+        agent_type: AgentType,
+        fmt: str,
+        rows_per_file: int,
+        row_group_size: int,
+    ):
+        self.directory = directory
+        self.prefix = agent_type.value
+        self.fmt = fmt
+        self.rows_per_file = rows_per_file
+        self.row_group_size = row_group_size
+        fields = RESULT_SCHEMAS.get(agent_type)
+        self.fields: Dict[str, Any] = (
+            {name: info.annotation for name, info in fields.model_fields.items()} if fields else {}
+        )
+        self.columns = ["session_id", "completed_at", *self.fields, "extra"]
+        # Continue numbering after files left by earlier runs
+        self.part = len(list(directory.glob(f"{self.prefix}-*.{fmt}")))
+        self.rows = 0
+        self._writer: Any = None
+        self._handle: Any = None
+        self._schema: Any = None
+        # Parquet rows waiting for a full row group; the writer keeps metadata
+        # for every row group until the file closes, so tiny groups add up
+        self._pending: List[List[Any]] = []
+
+    def _arrow_schema(self) -> Any:
+        pa = _get_pyarrow()
+        types = {int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+        return pa.schema(
+            [("session_id", pa.string()), ("completed_at", pa.float64())]
+            + [(name, types.get(annotation, pa.string())) for name, annotation in self.fields.items()]
+            + [("extra", pa.string())]
+        )
+
+    def _open(self) -> None:
+        path = self.directory / f"{self.prefix}-{self.part:05d}.{self.fmt}"
+        if self.fmt == "parquet":
+            self._schema = self._arrow_schema()
+            self._writer = _get_pyarrow().parquet.ParquetWriter(str(path), self._schema)
+        else:
+            self._handle = open(path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._handle)
+            self._writer.writerow(self.columns)
+
+    def close(self) -> None:
+        """Finish the current file (a Parquet file is only readable once closed)."""
+        if self._writer is None:
+            return
+        if self.fmt == "parquet":
+            self._write_row_group()
+            self._writer.close()
+        else:
+            self._handle.close()
+        self._writer = self._handle = None
+        self.part += 1
+        self.rows = 0
+
+    def write(self, rows: List[Tuple[str, float, Dict[str, Any]]]) -> None:
+        start = 0
+        while start < len(rows):
+            if self._writer is None:
+                self._open()
+            chunk = rows[start:start + self.rows_per_file - self.rows]
+            self._write_chunk(chunk)
+            start += len(chunk)
+            self.rows += len(chunk)
+            if self.rows >= self.rows_per_file:
+                self.close()
+
+    def _write_chunk(self, rows: List[Tuple[str, float, Dict[str, Any]]]) -> None:
+        table = []
+        for session_id, completed_at, data in rows:
+            extra = {key: value for key, value in data.items() if key not in self.fields}
+            table.append(
+                [session_id, completed_at]
+                + [_cell(data.get(name), annotation) for name, annotation in self.fields.items()]
+                + [json.dumps(extra, default=str) if extra else None]
+            )
+        if self.fmt == "parquet":
+            self._pending.extend(table)
+            if len(self._pending) >= self.row_group_size:
+                self._write_row_group()
+        else:
+            self._writer.writerows(table)
+            self._handle.flush()
+
+    def _write_row_group(self) -> None:
+        if not self._pending:
+            return
+        pa = _get_pyarrow()
+        columns = list(zip(*self._pending))
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema,
+        ))
+        self._pending = []
+
+
+class ResultExporter:
+    """
+    Streams completed results to JSONL and columnar files.
+
+    ``emit`` only appends to an in-memory buffer, so it does not block the
+    event loop on file writes. A background thread writes the buffer out
+    every ``flush_interval_s`` seconds, and right away once it reaches
+    ``buffer_size`` records. Only if results arrive faster than the thread
+    can write them, and ``max_buffered`` records pile up, does ``emit``
+    write the backlog itself; that backpressure bounds memory. JSONL and CSV are written on every flush; Parquet rows are
+    grouped into row groups of ``row_group_size``. Columnar files roll over
+    every ``rows_per_file`` rows, so memory stays flat however many records
+    are exported.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        columnar: Optional[str] = "auto",
+        buffer_size: int = 1000,
+        max_buffered: Optional[int] = None,
+        flush_interval_s: float = 5.0,
+        rows_per_file: int = 1_000_000,
+        row_group_size: int = 10_000,
+        blob_store: Optional[BlobStore] = None,
+    ):
+        """
+        Args:
+            directory: Output directory, created if missing
+            columnar: "parquet", "csv", "auto" (Parquet if pyarrow is
+                installed, else CSV) or None for JSONL only
+            buffer_size: Records buffered before the background thread is
+                woken to flush
+            max_buffered: Records buffered before ``emit`` flushes inline;
+                defaults to ten times ``buffer_size``
+            flush_interval_s: Seconds between background flushes; 0 flushes
+                only when the buffer is full (and on ``flush``/``close``)
+            rows_per_file: Rows per columnar file before rolling to the next
+            row_group_size: Rows per Parquet row group; rows wait in memory
+                until a group is full (CSV rows are written on every flush)
+            blob_store: Store used to resolve blob handles (e.g. PDF text) on export
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if columnar == "auto":
+            columnar = "parquet" if _get_pyarrow() else "csv"
+        if columnar == "parquet" and not _get_pyarrow():
+            raise ImportError("Parquet export requires pyarrow; install it or use columnar='csv'")
+        self.columnar = columnar
+        self.buffer_size = buffer_size
+        self.max_buffered = max_buffered or 10 * buffer_size
+        self.rows_per_file = rows_per_file
+        self.row_group_size = row_group_size
+        self.blob_store = blob_store
+        self.stats: Dict[str, int] = {"records": 0, "flushes": 0, "inline_flushes": 0}
+
+        self._buffer: List[Tuple[str, str, float, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._jsonl = open(self.directory / "results.jsonl", "a", encoding="utf-8")
+        self._columnar_files: Dict[AgentType, _ColumnarFile] = {}
+        self._closed = False
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._run, args=(flush_interval_s if flush_interval_s > 0 else None,), daemon=True,
+        )
+        self._flusher.start()
+
+    def _run(self, interval: Optional[float]) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            if not self._stop.is_set():
+                self.flush()
+
+    def emit(self, session_id: Optional[str], result: DataCollectionResult) -> None:
+        """
+        Queue one completed result for export.
+
+        Raises:
+            RuntimeError: If the exporter has been closed
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"ResultExporter for {self.directory} is closed")
+            self._buffer.append((session_id or "", result.agent_type, time.time(), dict(result.data)))
+            buffered = len(self._buffer)
+        if buffered >= self.max_buffered:
+            # The flusher is falling behind; write here rather than grow
+            self.stats["inline_flushes"] += 1
+            self.flush()
+        elif buffered >= self.buffer_size:
+            # Writing (and resolving blobs) happens on the flusher thread
+            self._wake.set()
+
+    def _resolve(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if self.blob_store is None:
+            return data
+        return {key: self.blob_store.resolve(value) if is_blob_handle(value) else value
+                for key, value in data.items()}
+
+    def flush(self) -> None:
+        """Write everything buffered so far."""
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+
+            by_agent: Dict[AgentType, List[Tuple[str, float, Dict[str, Any]]]] = {}
+            lines = []
+            for session_id, agent_type, completed_at, data in batch:
+                data = self._resolve(data)
+                lines.append(json.dumps({
+                    "session_id": session_id,
+                    "agent_type": agent_type.value,
+                    "completed_at": completed_at,
+                    "data": data,
+                }, default=str))
+                by_agent.setdefault(agent_type, []).append((session_id, completed_at, data))
+
+            self._jsonl.write("\n".join(lines) + "\n")
+            self._jsonl.flush()
+            if self.columnar:
+                for agent_type, rows in by_agent.items():
+                    output = self._columnar_files.get(agent_type)
+                    if output is None:
+                        output = self._columnar_files[agent_type] = _ColumnarFile(
+                            self.directory, agent_type, self.columnar,
+                            self.rows_per_file, self.row_group_size,
+                        )
+                    output.write(rows)
+
+            self.stats["records"] += len(batch)
+            self.stats["flushes"] += 1
+
+    def close(self) -> None:
+        """Flush, stop the background flusher and finish all files."""
+        with self._lock:
+            if self._closed:
+                return
+            # Later emits raise instead of being lost
+            self._closed = True
+        self._stop.set()
+        self._wake.set()
+        self._flusher.join()
+        self.flush()
+        with self._write_lock:
+            for output in self._columnar_files.values():
+                output.close()
+            self._jsonl.close()
+
+    def __enter__(self) -> "ResultExporter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -20,6 +20,16 @@ class AgentIntent(BaseModel):
     reasoning: str = Field(description="Explanation for the routing decision")
 
 
+class BatchedAgentIntent(AgentIntent):
+    """Routing decision for one request inside a batched routing call."""
+    index: int = Field(description="Index of the request this decision belongs to")
+
+
+class AgentIntentBatch(BaseModel):
+    """Intent classification results for a batch of routing requests."""
+    decisions: List[BatchedAgentIntent] = Field(description="One routing decision per request")
+
+
 class Agent1Data(BaseModel):
     """Structured data collected by Agent 1."""
     field_a: str = Field(description="Data field a")
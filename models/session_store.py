@@ -0,0 +1,214 @@
+"""
+Tiered store for session state in long-running deployments.
+
+Most sessions sit idle between turns. ``SessionStore`` keeps recently used
+sessions as live objects (hot), compresses those idle past a threshold into
+an in-memory blob (warm) and, once the compressed blobs exceed the memory
+budget, evicts the least recently used ones to disk (cold). Reading a warm or
+cold session rehydrates it transparently; the time that takes is recorded
+per tier so it can be weighed against the memory saved.
+"""
+import os
+import pickle
+import re
+import time
+import zlib
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Container, Deque, Dict, Iterator, Optional
+
+
+class SessionStore:
+    """
+    Mapping of session id to session object with hot, warm and cold tiers.
+
+    Call ``compact_idle`` periodically (e.g. from a background task) to move
+    idle sessions down the tiers; ``get`` moves a session back up.
+    """
+
+    def __init__(
+        self,
+        idle_after_s: float = 300.0,
+        memory_budget_bytes: int = 256 * 2 ** 20,
+        directory: Optional[str] = None,
+        compression_level: int = 6,
+        latency_samples: int = 10_000,
+    ):
+        """
+        Args:
+            idle_after_s: Seconds since last use before a session is compressed
+            memory_budget_bytes: Budget for compressed sessions held in memory;
+                beyond it the least recently used are evicted to ``directory``
+            directory: Where to evict sessions (created if missing, and owned
+                by the store: leftover files from an earlier run are removed).
+                Without one, compressed sessions stay in memory
+            compression_level: zlib level, 1 (fast) to 9 (small)
+            latency_samples: Most recent rehydrations per tier kept for the
+                latency report
+        """
+        self.idle_after_s = idle_after_s
+        self.memory_budget_bytes = memory_budget_bytes
+        self.directory = Path(directory) if directory else None
+        self.compression_level = compression_level
+        self._hot: Dict[str, Any] = {}
+        self._last_used: Dict[str, float] = {}
+        self._warm: "OrderedDict[str, bytes]" = OrderedDict()
+        self._warm_bytes = 0
+        self._cold: Dict[str, int] = {}
+        self._rehydrate_ms: Dict[str, Deque[float]] = {
+            "warm": deque(maxlen=latency_samples),
+            "cold": deque(maxlen=latency_samples),
+        }
+        self.stats: Dict[str, int] = {"compressed": 0, "evicted": 0, "raw_bytes": 0, "compressed_bytes": 0}
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for stale in self.directory.glob("*.session"):
+                stale.unlink()
+
+    def _path(self, session_id: str) -> Path:
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)
+        return self.directory / f"{safe_id}.session"
+
+    def __len__(self) -> int:
+        return len(self._hot) + len(self._warm) + len(self._cold)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._hot or session_id in self._warm or session_id in self._cold
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._hot)
+        yield from list(self._warm)
+        yield from list(self._cold)
+
+    def tier(self, session_id: str) -> Optional[str]:
+        """Tier holding the session ("hot", "warm" or "cold"), or None if unknown."""
+        if session_id in self._hot:
+            return "hot"
+        if session_id in self._warm:
+            return "warm"
+        if session_id in self._cold:
+            return "cold"
+        return None
+
+    def put(self, session_id: str, session: Any) -> None:
+        """Store a session as hot, replacing any older copy."""
+        self._discard(session_id)
+        self._hot[session_id] = session
+        self._last_used[session_id] = time.monotonic()
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Return the session, rehydrating it if it was compressed or evicted."""
+        session = self._hot.get(session_id)
+        if session is None:
+            tier = self.tier(session_id)
+            if tier is None:
+                return None
+            start = time.perf_counter()
+            session = self._load(session_id)
+            self._rehydrate_ms[tier].append((time.perf_counter() - start) * 1000)
+            self._hot[session_id] = session
+        self._last_used[session_id] = time.monotonic()
+        return session
+
+    def pop(self, session_id: str) -> Optional[Any]:
+        """Remove and return a session from whichever tier holds it."""
+        session = self._hot.pop(session_id, None)
+        if session is None and session_id in self:
+            session = self._load(session_id)
+        self._last_used.pop(session_id, None)
+        return session
+
+    def _load(self, session_id: str) -> Any:
+        """Decompress a warm or cold session and drop its blob."""
+        data = self._warm.pop(session_id, None)
+        if data is not None:
+            self._warm_bytes -= len(data)
+        else:
+            self._cold.pop(session_id)
+            path = self._path(session_id)
+            data = path.read_bytes()
+            path.unlink()
+        return pickle.loads(zlib.decompress(data))
+
+    def _discard(self, session_id: str) -> None:
+        self._hot.pop(session_id, None)
+        data = self._warm.pop(session_id, None)
+        if data is not None:
+            self._warm_bytes -= len(data)
+        if self._cold.pop(session_id, None) is not None:
+            self._path(session_id).unlink(missing_ok=True)
+
+    def compact_idle(self, now: Optional[float] = None, busy: Container[str] = ()) -> int:
+        """
+        Compress hot sessions idle past the threshold, then evict to disk
+        while compressed sessions exceed the memory budget.
+
+        Args:
+            now: ``time.monotonic()`` timestamp to measure idleness against
+            busy: Session ids in use (e.g. mid-turn) that must stay hot
+
+        Returns:
+            Number of sessions compressed
+        """
+        now = time.monotonic() if now is None else now
+        idle = [
+            session_id for session_id in self._hot
+            if now - self._last_used[session_id] >= self.idle_after_s and session_id not in busy
+        ]
+        # Oldest first, so the least recently used end up first in line for eviction
+        idle.sort(key=self._last_used.__getitem__)
+        for session_id in idle:
+            raw = pickle.dumps(self._hot.pop(session_id), protocol=pickle.HIGHEST_PROTOCOL)
+            data = zlib.compress(raw, self.compression_level)
+            self._warm[session_id] = data
+            self._warm_bytes += len(data)
+            self.stats["compressed"] += 1
+            self.stats["raw_bytes"] += len(raw)
+            self.stats["compressed_bytes"] += len(data)
+        self._evict()
+        return len(idle)
+
+    def _evict(self) -> None:
+        if self.directory is None:
+            return
+        while self._warm and self._warm_bytes > self.memory_budget_bytes:
+            session_id, data = self._warm.popitem(last=False)
+            self._warm_bytes -= len(data)
+            path = self._path(session_id)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._cold[session_id] = len(data)
+            self.stats["evicted"] += 1
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Tier sizes, compressed bytes held in memory and on disk, and
+        rehydration latency per tier over the last ``latency_samples``
+        rehydrations.
+
+        Returns:
+            Dict with ``hot``/``warm``/``cold`` counts, ``warm_bytes``,
+            ``cold_bytes``, ``compression_ratio`` and ``rehydrate_ms`` holding
+            ``count``/``avg``/``p50``/``p99`` for each tier
+        """
+        latency = {}
+        for tier, samples in self._rehydrate_ms.items():
+            ordered = sorted(samples)
+            latency[tier] = {
+                "count": len(ordered),
+                "avg": sum(ordered) / len(ordered) if ordered else 0.0,
+                "p50": ordered[len(ordered) // 2] if ordered else 0.0,
+                "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else 0.0,
+            }
+        return {
+            "hot": len(self._hot),
+            "warm": len(self._warm),
+            "cold": len(self._cold),
+            "warm_bytes": self._warm_bytes,
+            "cold_bytes": sum(self._cold.values()),
+            "compression_ratio": (
+                self.stats["raw_bytes"] / self.stats["compressed_bytes"] if self.stats["compressed_bytes"] else 0.0
+            ),
+            "rehydrate_ms": latency,
+        }